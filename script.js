@@ -1,10 +1,52 @@
-// Global variable for county-level data
-let cachedGeoJSON;
+// Projects are stored in one file per state (see scripts/shards.py)
+// Each file is only downloaded the first time a county in that state is opened
+const projectShards = {};
+
+// Returns a promise of the projects in one county
+function loadCountyProjects(joinKey) {
+    // The state is the last part of the join_key
+    const state = joinKey.split('_').pop();
+    if (!(state in projectShards)) {
+        projectShards[state] = fetch(`data/projects/${state}.json`)
+            .then(response => response.ok ? response.json() : { fields: [], counties: {} });
+    }
+    // Projects are stored as lists of values, in the order given by fields
+    return projectShards[state].then(shard => (shard.counties[joinKey] || []).map(values =>
+        Object.fromEntries(shard.fields.map((field, i) => [field, values[i]]))
+    ));
+}
 
-let cachedJSON = [];
-fetch('data/all_queued_projects.json')
-    .then(response => response.json())
-    .then(data => cachedJSON = data);
+// Capacity by ISO/utility, fuel and queue year for the counties of each state (see scripts/cube.py)
+// Like the projects, each state's tile is only downloaded the first time one of its counties is opened
+const cubeTiles = {};
+
+// Returns a promise of the number of projects in one county, and its queued capacity by queue year
+function loadCountyCube(joinKey) {
+    const state = joinKey.split('_').pop();
+    if (!(state in cubeTiles)) {
+        cubeTiles[state] = fetch(`data/cube/counties/${state}.json`)
+            .then(response => response.ok ? response.json() : null);
+    }
+    return cubeTiles[state].then(tile => {
+        const summary = { projects: 0, capacityByYear: {} };
+        // Every row points to its dimension values by position, and -1 means the value is missing
+        const county = tile ? tile.dimensions.join_key.indexOf(joinKey) : -1;
+        if (county === -1) {
+            return summary;
+        }
+        const columns = tile.columns;
+        columns.join_key.forEach((code, row) => {
+            if (code !== county) {
+                return;
+            }
+            const yearCode = columns.queue_year[row];
+            const year = yearCode === -1 ? 'Unknown' : tile.dimensions.queue_year[yearCode];
+            summary.capacityByYear[year] = (summary.capacityByYear[year] || 0) + columns.capacity[row];
+            summary.projects += columns.projects[row];
+        });
+        return summary;
+    });
+}
 
 // Create the leaflet map
 // Centered on a point in Kansas
@@ -18,137 +60,207 @@ L.tileLayer('https://server.arcgisonline.com/ArcGIS/rest/services/Canvas/World_L
 }).addTo(map);
 
 
-// Function to load data from a GeoJSON and add it to the map
-// Accepts a GeoJSON object and a symbology function
-// Includes functionality to create a pie chart in the pop-up
-function loadMap(data, symbology) {
-    L.geoJSON(data, {
-        style: symbology,
-        onEachFeature: function (feature, layer) {
-            // Extract data for the pop-up panel with pie chart
-            const countyName = feature.properties.join_key;
-            const totalMW = feature.properties.total_capacity;
-            const solarMW = feature.properties.total_solar;
-            const ssMW = feature.properties.total_hybrid;
-            const windMW = feature.properties.total_wind;
-            const storageMW = feature.properties.total_storage;
-            const gasMW = feature.properties.total_natural_gas;
-            const otherMW = feature.properties.total_other;
-            const rtoCount = feature.properties.rto_count;
-
-            // Only counties with at least 1 project will have a pop-up
-            if (totalMW > 0 && totalMW !== null) {
-                // Pie chart gets id from join_key
-                const canvasId = `county-pie-chart-${feature.properties.join_key.replace(/\s+/g, '-')}`;
-
-                // Create the pop-up content
-                const popupContent = `
-                    <h3>${countyName}</h3>
-                    <p>Total queued energy: ${totalMW.toFixed(1)} MW</p>
-                    <canvas id="${canvasId}" width="250" height="250"></canvas>
-                `;
-
-                layer.bindPopup(popupContent);
-
-                // Event listener for popupopen
-                layer.on('popupopen', function() {
-                    const pieData = {
-                        labels: [],
-                        datasets: [{
-                            data: [],
-                            backgroundColor: []
-                        }]
-                    };
-
-                    // Create data labels for pie chart
-                    // Assign values taken from geoJSON file and give colors
-                    const energySources = [
-                        { label: `Solar: ${solarMW.toFixed(1)} MW`, value: solarMW, color: '#FFD700' },
-                        { label: `Hybrid: ${ssMW.toFixed(1)} MW`, value: ssMW, color: '#FFAA00' },
-                        { label: `Wind: ${windMW.toFixed(1)} MW`, value: windMW, color: '#00BFFF' },
-                        { label: `Storage: ${storageMW.toFixed(1)} MW`, value: storageMW, color: '#32CD32' },
-                        { label: `Gas: ${gasMW.toFixed(1)} MW`, value: gasMW, color: '#FF6347' },
-                        { label: `Other: ${otherMW.toFixed(1)} MW`, value: otherMW, color: '#B0C4DE' }
-                    ];
-                    
-                    // Ensure that labels are only added when that fuel type is present in the county
-                    // Otherwise, it crowds up the panel and makes everything less readable
-                    energySources.forEach(source => {
-                        if (source.value > 0) {
-                            pieData.labels.push(source.label);
-                            pieData.datasets[0].data.push(source.value);
-                            pieData.datasets[0].backgroundColor.push(source.color);
-                        }
-                    });
-
-                    // Create pie chart
-                    const ctx = document.getElementById(canvasId).getContext('2d');
-                    new Chart(ctx, {
-                        type: 'pie',
-                        data: pieData,
-                        options: {
-                            responsive: true,
-                            plugins: {
-                                legend: {
-                                    position: 'top',
-                                },
-                                tooltip: {
-                                    callbacks: {
-                                        label: function(tooltipItem) {
-                                            // Calculate percentage of that fuel type is to total queued generation
-                                            return ' ' + (tooltipItem.raw / totalMW * 100).toFixed(1) + '%';
-                                        }
-                                    }
-                                }
-                            }
-                        }
-                    });
+// The county data is stored as vector tiles in a single PMTiles archive (see scripts/tiles.py)
+// Only the tiles in view are downloaded, using range requests on that one file
+const countyArchive = new pmtiles.PMTiles('data/agg_county_data.pmtiles');
+
+// Leaflet.VectorGrid normally downloads each tile from its own URL
+// This layer reads the tile out of the archive instead, and hands it to VectorGrid as a temporary URL
+const CountyTileLayer = L.VectorGrid.Protobuf.extend({
+    _getVectorTilePromise: function(coords, tileBounds) {
+        return countyArchive.getZxy(coords.z, coords.x, coords.y).then(tile => {
+            if (!tile) {
+                return { layers: [] };
+            }
+            const tileUrl = URL.createObjectURL(new Blob([tile.data]));
+            this._url = tileUrl;
+            return L.VectorGrid.Protobuf.prototype._getVectorTilePromise.call(this, coords, tileBounds)
+                .finally(() => URL.revokeObjectURL(tileUrl));
+        });
+    }
+});
 
-                    const joinKey = feature.properties.join_key
-                    const tableBody = document.getElementById('table-body');
-                    console.log(cachedJSON)
-                    // Clear existing table content
-                    tableBody.innerHTML = '';
+// The symbology currently shown on the map
+let currentSymbology;
+// The county layer, and the join_key of every county it has drawn so far
+let countyLayer;
+const drawnCounties = new Set();
+
+// Function to load the county tiles and add them to the map
+// Accepts the symbology to start with
+// The layer is only created once, the buttons change its colors with setSymbology
+// Clicking on a county opens its pop-up
+function loadMap(symbology) {
+    currentSymbology = symbology;
+    countyLayer = new CountyTileLayer('', {
+        rendererFactory: L.canvas.tile,
+        interactive: true,
+        // Tiles only exist for zoom levels 3 to 8, other zoom levels stretch the closest ones
+        minNativeZoom: 3,
+        maxNativeZoom: 8,
+        getFeatureId: feature => feature.properties.join_key,
+        vectorTileLayerStyles: {
+            // The symbology functions take a GeoJSON-style feature, and counties need to be filled
+            counties: properties => {
+                drawnCounties.add(properties.join_key);
+                return Object.assign({ fill: true }, currentSymbology({ properties: properties }));
+            }
+        }
+    });
+    countyLayer.on('click', event => openCountyPopup(event.layer.properties, event.latlng));
+    countyLayer.addTo(map);
+}
 
-                    // Filter JSON data based on join_key
-                    const filteredData = cachedJSON.filter(row => row.join_key === joinKey);
+// Recolors the counties that are already drawn, without reloading any tiles
+// Tiles loaded later pick up the new symbology on their own
+function setSymbology(symbology) {
+    currentSymbology = symbology;
+    drawnCounties.forEach(joinKey => countyLayer.resetFeatureStyle(joinKey));
+}
 
-                    if (filteredData.length === 0) {
-                        tableBody.innerHTML = '<tr><td colspan="5">No data found</td></tr>';
-                        return;
-                    }
+// Opens the pop-up panel with a pie chart for one county, and fills the project table
+function openCountyPopup(properties, latlng) {
+    // Extract data for the pop-up panel with pie chart
+    const countyName = properties.join_key;
+    const totalMW = properties.total_capacity;
+    const solarMW = properties.total_solar;
+    const ssMW = properties.total_hybrid;
+    const windMW = properties.total_wind;
+    const storageMW = properties.total_storage;
+    const gasMW = properties.total_natural_gas;
+    const otherMW = properties.total_other;
+    const rtoCount = properties.rto_count;
+
+    // Only counties with at least 1 project will have a pop-up
+    if (!(totalMW > 0)) {
+        return;
+    }
 
-                    // Populate table rows
-                    filteredData.forEach(row => {
-                        const tr = document.createElement('tr');
-                        ["id", "name", "capacity", "fuel", "submitted_date", "service_date", "transmission_owner", "iso_utility"].forEach(key => {
-                            const td = document.createElement('td');
-                            td.textContent = row[key] || 'N/A'; // Use 'N/A' if the key doesn't exist
-                            tr.appendChild(td);
-                        });
-                        tableBody.appendChild(tr);
-                    });
-                });
+    // Pie chart gets id from join_key
+    const canvasId = `county-pie-chart-${properties.join_key.replace(/\s+/g, '-')}`;
+
+    // Create the pop-up content
+    const popupContent = `
+        <h3>${countyName}</h3>
+        <p>Total queued energy: ${totalMW.toFixed(1)} MW</p>
+        <p id="${canvasId}-count"></p>
+        <canvas id="${canvasId}" width="250" height="250"></canvas>
+        <canvas id="${canvasId}-years" width="250" height="150"></canvas>
+    `;
+
+    L.popup().setLatLng(latlng).setContent(popupContent).openOn(map);
+
+    const pieData = {
+        labels: [],
+        datasets: [{
+            data: [],
+            backgroundColor: []
+        }]
+    };
+
+    // Create data labels for pie chart
+    // Assign values taken from the county tiles and give colors
+    const energySources = [
+        { label: `Solar: ${solarMW.toFixed(1)} MW`, value: solarMW, color: '#FFD700' },
+        { label: `Hybrid: ${ssMW.toFixed(1)} MW`, value: ssMW, color: '#FFAA00' },
+        { label: `Wind: ${windMW.toFixed(1)} MW`, value: windMW, color: '#00BFFF' },
+        { label: `Storage: ${storageMW.toFixed(1)} MW`, value: storageMW, color: '#32CD32' },
+        { label: `Gas: ${gasMW.toFixed(1)} MW`, value: gasMW, color: '#FF6347' },
+        { label: `Other: ${otherMW.toFixed(1)} MW`, value: otherMW, color: '#B0C4DE' }
+    ];
+    
+    // Ensure that labels are only added when that fuel type is present in the county
+    // Otherwise, it crowds up the panel and makes everything less readable
+    energySources.forEach(source => {
+        if (source.value > 0) {
+            pieData.labels.push(source.label);
+            pieData.datasets[0].data.push(source.value);
+            pieData.datasets[0].backgroundColor.push(source.color);
+        }
+    });
+
+    // Create pie chart
+    const ctx = document.getElementById(canvasId).getContext('2d');
+    new Chart(ctx, {
+        type: 'pie',
+        data: pieData,
+        options: {
+            responsive: true,
+            plugins: {
+                legend: {
+                    position: 'top',
+                },
+                tooltip: {
+                    callbacks: {
+                        label: function(tooltipItem) {
+                            // Calculate percentage of that fuel type is to total queued generation
+                            return ' ' + (tooltipItem.raw / totalMW * 100).toFixed(1) + '%';
+                        }
+                    }
+                }
             }
         }
-    }).addTo(map);
-}
+    });
+
+    const joinKey = properties.join_key
+
+    // Number of projects and queued capacity by queue year, read from the county's cube tile
+    loadCountyCube(joinKey).then(summary => {
+        const countElement = document.getElementById(`${canvasId}-count`);
+        // The pop-up may have been closed before the tile arrived
+        if (!countElement) {
+            return;
+        }
+        countElement.textContent = `Queued projects: ${summary.projects}`;
+        const years = Object.keys(summary.capacityByYear).sort();
+        new Chart(document.getElementById(`${canvasId}-years`).getContext('2d'), {
+            type: 'bar',
+            data: {
+                labels: years,
+                datasets: [{
+                    data: years.map(year => summary.capacityByYear[year]),
+                    backgroundColor: '#708090'
+                }]
+            },
+            options: {
+                responsive: true,
+                plugins: {
+                    legend: { display: false },
+                    title: { display: true, text: 'Queued MW by year entered' }
+                }
+            }
+        });
+    });
 
-// Function to clear all loaded layers from the map 
-// Designed to be called when the user clicks on a button to change the symbology
-function clearMap(map) {
-    map.eachLayer(function(layer) {
-        if (layer instanceof L.GeoJSON) {
-            map.removeLayer(layer);
+    const tableBody = document.getElementById('table-body');
+    // Clear existing table content
+    tableBody.innerHTML = '';
+
+    // Look up the projects in this county by join_key
+    loadCountyProjects(joinKey).then(filteredData => {
+        if (filteredData.length === 0) {
+            tableBody.innerHTML = '<tr><td colspan="5">No data found</td></tr>';
+            return;
         }
+
+        // Populate table rows
+        filteredData.forEach(row => {
+            const tr = document.createElement('tr');
+            ["id", "name", "capacity", "fuel", "submitted_date", "service_date", "transmission_owner", "iso_utility"].forEach(key => {
+                const td = document.createElement('td');
+                td.textContent = row[key] || 'N/A'; // Use 'N/A' if the key doesn't exist
+                tr.appendChild(td);
+            });
+            tableBody.appendChild(tr);
+        });
     });
 }
 
-// This function acts as a "holding container" for the other symbology functions
-// Otherwise, it would be be possible to pass arguments to the symbology functions
-// Therefore each of the symbology functions can call this one to set the arugments
-function setStyleFuelTotal(feature, fuelType, thresholds, colors) {
-    const MW_val = feature.properties[fuelType];
+// Every symbology function takes a county and returns its style
+// The classes and the leading fuel are worked out by the pipeline (see scripts/classes.py),
+// so each function only has to look up a color
+function setStyleFuelClass(feature, classField, colors) {
+    const classCode = feature.properties[classField];
 
     // This style object contains the default symbology that will be changed by the below code
     const style = {
@@ -158,68 +270,55 @@ function setStyleFuelTotal(feature, fuelType, thresholds, colors) {
         fillOpacity: 0.6
     };
 
-    // If there is no queued generation, make the feature transparent
+    // Class 0 means there is no queued generation, so make the feature transparent
     // Makes it easier to focus on counties that do have data
-    if (MW_val === 0 || MW_val === null) {
+    if (!classCode) {
         style.fillOpacity = 0;
         return style;
     }
 
-    // Each defined symbology will have color values and MW thresholds
-    // These form a graduated symbology
-    for (let i = 0; i < thresholds.length; i++) {
-        if (MW_val > thresholds[i]) {
-            style.fillColor = colors[i];
-            break;
-        }
-    }
-
+    // Classes are numbered from 1 (lowest), while the colors are listed from highest to lowest
+    style.fillColor = colors[colors.length - classCode];
     return style;
 }
 
 // The below functions are used to set the symbology in different circumstances
-// By calling the setStyleFuelTotal function with the appropriate arguments, these functions can be inserted into the loadMap function
+// Each layer needs as many colors as it has classes (class_counts in scripts/config.py)
 
 const solarSymbology = function(feature) {
-    return setStyleFuelTotal(feature = feature, fuelType = 'total_solar',
-        thresholds = [2000, 750, 300, 100, 0],
-        colors = ['#993404', '#d95f0e', '#fe9929', '#fed98e', '#ffffd4']);
+    return setStyleFuelClass(feature, 'class_solar',
+        ['#993404', '#d95f0e', '#fe9929', '#fed98e', '#ffffd4']);
 }
 const windSymbology = function(feature) {
-    return setStyleFuelTotal(feature = feature, fuelType = 'total_wind',
-        thresholds = [750, 500, 200, 50, 0],
-        colors = ['#08306b', '#2979b9', '#73b2d8', '#c8dcf0', '#f7fbff']);
+    return setStyleFuelClass(feature, 'class_wind',
+        ['#08306b', '#2979b9', '#73b2d8', '#c8dcf0', '#f7fbff']);
 }
 const ngSymbology = function(feature) {
-    return setStyleFuelTotal(feature = feature, fuelType = 'total_natural_gas',
-        thresholds = [750, 500, 200, 50, 0],
-        colors = ['#67000d', '#d32020', '#fb7050', '#fcbea5', '#fff5f0']);
+    return setStyleFuelClass(feature, 'class_natural_gas',
+        ['#67000d', '#d32020', '#fb7050', '#fcbea5', '#fff5f0']);
 }
 const storageSymbology = function(feature) {
-    return setStyleFuelTotal(feature = feature, fuelType = 'total_storage',
-        thresholds = [750, 500, 200, 50, 0],
-        colors = ['#00441b', '#1d8641', '#55b567', '#9ed798', '#d5efcf']);
+    return setStyleFuelClass(feature, 'class_storage',
+        ['#00441b', '#1d8641', '#55b567', '#9ed798', '#d5efcf']);
 }
 const hybridSymbology = function(feature) {
-    return setStyleFuelTotal(feature = feature, fuelType = 'total_hybrid',
-        thresholds = [2000, 750, 300, 100, 0],
-        colors = ['#993404', '#d95f0e', '#fe9929', '#fed98e', '#ffffd4']);
+    return setStyleFuelClass(feature, 'class_hybrid',
+        ['#993404', '#d95f0e', '#fe9929', '#fed98e', '#ffffd4']);
 }
 const otherSymbology = function(feature) {
-    return setStyleFuelTotal(feature = feature, fuelType = 'total_other',
-        thresholds = [200, 80, 50, 20, 0],
-        colors = ['#050505', '#363636', '#676767', '#989898', '#c9c9c9']);
+    return setStyleFuelClass(feature, 'class_other',
+        ['#050505', '#363636', '#676767', '#989898', '#c9c9c9']);
 }
 const totalGenSymbology = function(feature) {
-    return setStyleFuelTotal(feature = feature, fuelType = 'total_capacity',
-        thresholds = [2000, 1200, 750, 500, 200, 50, 0],
-        colors = ['#810f7c', '#863e99', '#896bb1', '#8c96c6', '#a6bbd9', '#c6dbeb', '#edf8fb']);
+    return setStyleFuelClass(feature, 'class_capacity',
+        ['#810f7c', '#863e99', '#896bb1', '#8c96c6', '#a6bbd9', '#c6dbeb', '#edf8fb']);
 }
 
+// Colors for each leading fuel code, in the same order as fuel_columns in scripts/aggregate.py
+// Solar, Solar+Storage, Storage, Wind, Natural Gas, Other
+const leadingFuelColors = ['#FFD700', '#FF8C00', '#006400', '#1E90FF', '#8B0000', '#7A7A7A'];
+
 // This symbology function colors the counties by the dominant fuel type
-// Therefore, it does not need to call the setStyleFuelTotal function
-// Instead, it uses the data from the feature it is being applied to
-// It finds which fuel has highest percentage of total queued generation
 function setStyleLeadingFuel(feature){
     const style = {
         color: 'gray',
@@ -227,53 +326,21 @@ function setStyleLeadingFuel(feature){
         fillColor: 'gray',
         fillOpacity: 0.6
     };
-    // Extract amount of total queued generation
-    const totalMW = feature.properties.total_capacity;
+    const leadingFuel = feature.properties.leading_fuel;
 
     // If the county has no queued generation, then make it transparent
-    if (totalMW === 0 || totalMW === null) {
+    if (!leadingFuel) {
         style.fillOpacity = 0;
         return style;
     }
-
-    // If the feature has some queued generation, then it will grab the other feature properties
-    const solarMW = feature.properties.total_solar;
-    const ssMW = feature.properties.total_hybrid;
-    const windMW = feature.properties.total_wind;
-    const storageMW = feature.properties.total_storage;
-    const gasMW = feature.properties.total_natural_gas;
-    const otherMW = feature.properties.total_other;
-    const rto_count = feature.properties.rto_count;
-
-    //Calculate dominant fuel type
-    const leading_fuel = Math.max(solarMW, ssMW, windMW, storageMW, gasMW, otherMW);
-
-    //Assign color based on fuel type
-    if (solarMW === leading_fuel){
-        style.fillColor = '#FFD700';
-    }
-    if (ssMW === leading_fuel){
-        style.fillColor = '#FF8C00';
-    }
-    if (windMW === leading_fuel){
-        style.fillColor = '#1E90FF'
-    }
-    if (storageMW === leading_fuel){
-        style.fillColor = '#006400'
-    }
-    if (gasMW === leading_fuel){
-        style.fillColor = '#8B0000';
-    } 
-    if (otherMW === leading_fuel){
-        style.fillColor = '#7A7A7A';
-    }
+    style.fillColor = leadingFuelColors[leadingFuel - 1];
 
     // If there's overlap between 2 or more ISOs/utilities in the county, 
     // give the feature a thick black line
     // In the main.py script, the aggregated county data is sorted by rto county before export
-    // This way, when the geojson loads with the dark lines, they display prominently
+    // This way, when the tiles load with the dark lines, they display prominently
     // In the future, this will be used to create its own layer to show overlap
-    if (rto_count >= 2) {
+    if (feature.properties.rto_count >= 2) {
         style.color = '#000000';
         style.weight = 3.5;
     }
@@ -291,47 +358,17 @@ const totalGenButton = document.getElementById('totalGenButton');
 const fuelButton = document.getElementById('fuelButton');
 
 // Add event listeners to the buttons
-// When the buttons are clicked, the script will reload the aggregated county data with a different symbology
-solarButton.addEventListener('click', function() {
-    clearMap(map);
-    loadMap(cachedGeoJSON, solarSymbology);
-});
-windButton.addEventListener('click', function() {
-    clearMap(map);
-    loadMap(cachedGeoJSON, windSymbology);
-});
-ngButton.addEventListener('click', function() {
-    clearMap(map);
-    loadMap(cachedGeoJSON, ngSymbology);
-});
-storageButton.addEventListener('click', function() {
-    clearMap(map);
-    loadMap(cachedGeoJSON, storageSymbology);
-});
-hybridButton.addEventListener('click', function() {
-    clearMap(map);
-    loadMap(cachedGeoJSON, hybridSymbology);
-});
-otherButton.addEventListener('click', function() {
-    clearMap(map);
-    loadMap(cachedGeoJSON, otherSymbology);
-});
-totalGenButton.addEventListener('click', function() {
-    clearMap(map);
-    loadMap(cachedGeoJSON, totalGenSymbology);
-});
-fuelButton.addEventListener('click', function() {
-    clearMap(map);
-    loadMap(cachedGeoJSON, setStyleLeadingFuel);
-});
+// When the buttons are clicked, the counties already on the map are recolored with a different symbology
+solarButton.addEventListener('click', () => setSymbology(solarSymbology));
+windButton.addEventListener('click', () => setSymbology(windSymbology));
+ngButton.addEventListener('click', () => setSymbology(ngSymbology));
+storageButton.addEventListener('click', () => setSymbology(storageSymbology));
+hybridButton.addEventListener('click', () => setSymbology(hybridSymbology));
+otherButton.addEventListener('click', () => setSymbology(otherSymbology));
+totalGenButton.addEventListener('click', () => setSymbology(totalGenSymbology));
+fuelButton.addEventListener('click', () => setSymbology(setStyleLeadingFuel));
 
 // Load aggregated county data onto map
 // By default, the map loads in with the total_capacity data 
 // The user can then change this by clicking on the buttons
-fetch('data/agg_county_data.geojson')
-    .then(response => response.json())
-    .then(data => {
-        cachedGeoJSON = data;
-        loadMap(data, totalGenSymbology);
-    })
-    .catch(error => console.error('Error loading GeoJSON data:', error));
+loadMap(totalGenSymbology);
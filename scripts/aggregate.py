@@ -0,0 +1,49 @@
+import pandas as pd
+
+# Column names used for each fuel type in the county-level data
+# These are the property names read by script.js
+fuel_columns = {"Solar": "total_solar",
+                "Solar+Storage": "total_hybrid",
+                "Storage": "total_storage",
+                "Wind": "total_wind",
+                "Natural Gas": "total_natural_gas",
+                "Other": "total_other"}
+
+def buildCountyPartials(projects):
+    # Sums the capacity of each fuel type for each ISO/utility in each county
+    # This is the smallest summary that the county data can still be built from,
+    # so it can be saved for each source and combined later without the original projects
+    # Capacity is stored as float32, but the sums are done in float64 so county totals do not lose precision
+    projects = projects.assign(capacity=projects["capacity"].astype("float64"))
+    partials = (
+        projects.groupby(["join_key", "iso_utility", "fuel"], observed=True)["capacity"]
+        .sum()
+        .reset_index()
+    )
+    return partials
+
+def aggregateCounties(partials):
+    # Aggregate based on county and fuel types
+    # Returns metrics for each fuel type by county
+    counties_by_fuel = (
+        partials.groupby(["join_key", "fuel"], observed=True)["capacity"]
+        .sum()
+        .unstack(fill_value=0)
+        # Every fuel type gets a column, even if no county has any projects of that type
+        .reindex(columns=list(fuel_columns), fill_value=0)
+        .rename(columns=fuel_columns)
+        .reset_index()
+    )
+    counties_by_fuel.columns.name = None
+
+    #### Add additional data ###
+
+    # Calculate total queued capacity for each county
+    total_capacity = partials.groupby("join_key", observed=True)["capacity"].sum().rename("total_capacity")
+
+    # Calculate the number of RTOs for each county
+    rto_count = partials.groupby("join_key", observed=True)["iso_utility"].nunique().rename("rto_count")
+
+    # Merge additional metrics into the aggregated DataFrame
+    counties_by_fuel = counties_by_fuel.merge(total_capacity, on="join_key").merge(rto_count, on="join_key").copy()
+    return counties_by_fuel
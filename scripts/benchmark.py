@@ -0,0 +1,418 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+from contextlib import contextmanager
+from xml.sax.saxutils import escape
+import pandas as pd
+import geopandas as gpd
+import requests
+from openpyxl import Workbook
+from shapely.geometry import box
+
+import utils
+import sources
+import miso, pjm, isone, nyiso, soco, soco2, tva, duke
+from aggregate import buildCountyPartials, aggregateCounties
+from counties import loadCounties, counties_feather
+from config import fuel_maps
+
+# Saved raw payloads and the stored baseline live here
+# The committed fixtures were built with --synthesize, and the baseline was saved from them
+# Run with --synthesize --save-baseline after changing how fixtures are built, or --record --save-baseline for live data
+benchmark_dir = os.path.abspath('scripts/script_data/benchmark')
+fixture_dir = f'{benchmark_dir}/fixtures'
+baseline_path = f'{benchmark_dir}/baseline.json'
+
+# Which saved payload answers each request, matched on part of the URL
+fixture_files = [('misoenergy.org/api/giqueue', 'miso.json'),
+                ('PlanningQueues.xml', 'pjm.xml'),
+                ('irtt.iso-ne.com/reports/exportpublicqueue', 'isone.xlsx'),
+                ('NYISO-Interconnection-Queue.xlsx', 'nyiso.xlsx'),
+                ('FERC-4.5-OASIS-Posting-DEP.xlsx', 'dep.xlsx'),
+                ('FERC-4.5-OASIS-Posting-DEC.xlsx', 'dec.xlsx'),
+                ('TVA/TVAdocs/QueueTransition_-_PublicPosting', 'tva.pdf'),
+                ('SOCO/SOCOdocs/Active-Gen-IC-Requests.pdf', 'soco.pdf')]
+# The SoCo Power BI table is saved as the rows and column names read from the page
+soco_grid_file = 'soco_grid.json'
+
+# Source transforms that get benchmarked, with the fixtures each one needs
+# Each source is run through sources.buildQueue, the same way the scheduler runs it
+benchmark_sources = [('miso', miso, ['miso.json']),
+                    ('pjm', pjm, ['pjm.xml']),
+                    ('isone', isone, ['isone.xlsx']),
+                    ('nyiso', nyiso, ['nyiso.xlsx']),
+                    ('duke', duke, ['dep.xlsx', 'dec.xlsx']),
+                    ('tva', tva, ['tva.pdf']),
+                    ('soco_pdf', soco, ['soco.pdf']),
+                    ('soco', soco2, [soco_grid_file])]
+
+# Number of copies of the combined queue used for the synthetic scale-ups
+scale_factors = [1, 10, 100]
+
+def findFixture(url):
+    for pattern, file_name in fixture_files:
+        if pattern in url:
+            return file_name
+    return None
+
+#### Sessions that stand in for utils.getSession() ####
+
+class ReplaySession:
+    # Answers every request with a saved payload instead of going to the network
+    def request(self, method, url, **kwargs):
+        response = requests.Response()
+        response.url = url
+        file_name = findFixture(url)
+        if (file_name is None) or (not os.path.exists(f'{fixture_dir}/{file_name}')):
+            response.status_code = 404
+            response._content = b''
+        else:
+            response.status_code = 200
+            if method == 'HEAD':
+                response._content = b''
+            else:
+                with open(f'{fixture_dir}/{file_name}', 'rb') as f:
+                    response._content = f.read()
+        # Lets iter_content() work for streamed downloads
+        response._content_consumed = True
+        return response
+
+class RecordingSession:
+    # Passes every request to the real session, and saves the payloads that have a fixture name
+    def __init__(self, session):
+        self.session = session
+
+    def request(self, method, url, **kwargs):
+        response = self.session.request(method, url, **kwargs)
+        file_name = findFixture(url)
+        if (file_name is not None) and (method == 'GET') and (response.status_code == 200):
+            with open(f'{fixture_dir}/{file_name}', 'wb') as f:
+                f.write(response.content)
+            print(f'Recorded {file_name}')
+        return response
+
+#### Synthetic fixtures ####
+
+# Fixtures can also be built from the committed backups, so the parsers can be benchmarked without the live endpoints
+# Each one is laid out like the real file, with the first synthetic_rows projects of the source
+# The PDF reports (tva.pdf, soco.pdf) can only be recorded, since building a PDF that tabula reads the same way needs a PDF writer
+synthetic_rows = 300
+
+def sourceFuel(fuel, source):
+    # Turns a standard fuel back into one of the codes the source uses for it
+    for code, standard_fuel in fuel_maps[source].get('codes', {}).items():
+        if standard_fuel == fuel:
+            return code
+    return 'Other'
+
+def dateText(dates):
+    return dates.dt.strftime('%Y-%m-%d').where(dates.notna(), None)
+
+def writeWorkbook(path, columns, rows, header_rows = 2, footer = []):
+    # Real workbooks have a title above the header row, and sometimes notes below the projects
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(['Interconnection Queue'])
+    for i in range(header_rows - 1):
+        sheet.append([])
+    sheet.append(columns)
+    for row in rows:
+        sheet.append(row)
+    for note in footer:
+        sheet.append([note])
+    workbook.save(path)
+
+def synthesizeFixtures():
+    os.makedirs(fixture_dir, exist_ok=True)
+    backups = {name: utils.enforceSchema(utils.readBackup(name)).head(synthetic_rows)
+                for name in ['miso', 'pjm', 'isone', 'nyiso', 'soco', 'duke']}
+
+    projects = backups['miso']
+    miso_projects = pd.DataFrame({'projectNumber': projects['id'],
+                                'poiName': projects['name'],
+                                'summerNetMW': projects['capacity'].astype(float),
+                                'fuelType': projects['fuel'].astype(str).map(lambda fuel: sourceFuel(fuel, 'miso')),
+                                'queueDate': dateText(projects['submitted_date']) + 'T00:00:00',
+                                'inService': dateText(projects['service_date']) + 'T00:00:00',
+                                'county': projects['county'].astype(str) + ' County',
+                                'state': projects['state'].astype(str),
+                                'transmissionOwner': projects['transmission_owner'].astype(str),
+                                'applicationStatus': 'Active'})
+    miso_projects.to_json(f'{fixture_dir}/miso.json', orient='records')
+
+    projects = backups['pjm']
+    elements = []
+    for project in projects.itertuples():
+        fields = {'ProjectNumber': project.id,
+                'Name': project.name,
+                'CommercialName': '',
+                'MWEnergy': project.capacity,
+                'Fuel': sourceFuel(project.fuel, 'pjm'),
+                'SubmittedDate': project.submitted_date.strftime('%Y-%m-%d') if pd.notna(project.submitted_date) else '',
+                'ProjectedInServiceDate': project.service_date.strftime('%Y-%m-%d') if pd.notna(project.service_date) else '',
+                'County': f'{project.county} County',
+                'State': project.state,
+                'TransmissionOwner': project.transmission_owner,
+                'Status': 'Active',
+                'ProjectType': 'Generation Interconnection'}
+        elements.append('<Project>' + ''.join(f'<{tag}>{escape(str(value))}</{tag}>' for tag, value in fields.items()) + '</Project>')
+    with open(f'{fixture_dir}/pjm.xml', 'w') as f:
+        f.write('<PlanningQueues>' + ''.join(elements) + '</PlanningQueues>')
+
+    projects = backups['isone']
+    writeWorkbook(f'{fixture_dir}/isone.xlsx',
+                ['Position', 'Alternative Name', 'Type', 'Net MW', 'Fuel Type', 'Requested', 'Op Date', 'County', 'State', 'TO Report'],
+                [[int(float(project.id)) if str(project.id).replace('.', '', 1).isdigit() else project.id, project.name, 'G', float(project.capacity),
+                    sourceFuel(project.fuel, 'isone'), project.submitted_date, project.service_date, project.county, project.state, project.transmission_owner]
+                    for project in projects.itertuples()])
+
+    projects = backups['nyiso']
+    writeWorkbook(f'{fixture_dir}/nyiso.xlsx',
+                ['Queue Pos.', 'Project Name', 'SP (MW)', 'Type/ Fuel', 'Date of IR', 'Proposed COD', 'County', 'State', 'Utility'],
+                [[project.id, project.name, float(project.capacity), sourceFuel(project.fuel, 'nyiso'),
+                    project.submitted_date, project.service_date, project.county, project.state, project.transmission_owner]
+                    for project in projects.itertuples()])
+
+    # DEP and DEC each get half of the Duke projects
+    projects = backups['duke']
+    for file_name, half in [('dep.xlsx', projects.iloc[::2]), ('dec.xlsx', projects.iloc[1::2])]:
+        writeWorkbook(f'{fixture_dir}/{file_name}',
+                    ['Source System Unique ID', 'Transmission Line', 'Substation Name', 'Installed Capacity MW AC', 'Energy Source Type',
+                        'Queue Issued Date', 'Duke Estimated Startup Date', 'Facility County', 'Facility State', 'OPCO', 'Operational Status'],
+                    [[project.id, project.name, '', float(project.capacity), sourceFuel(project.fuel, 'duke'), project.submitted_date,
+                        project.service_date, project.county, project.state, project.transmission_owner, 'Active']
+                        for project in half.itertuples()],
+                    footer = ['Notes:', 'Capacities are in MW AC'])
+
+    # SoCo lists every fuel of a project in brackets in one column
+    projects = backups['soco']
+    soco_fuels = {'Solar': 'Solar', 'Storage': 'Batteries', 'Solar+Storage': 'Solar) (Batteries', 'Wind': 'Wind', 'Natural Gas': 'Natural Gas', 'Other': 'Other'}
+    columns = ['Request\n ', 'Proposed POI', 'Total Net MW', 'Gen Type/Size', 'Queue Date', 'In-Service Requested', 'Gen Facility Location']
+    rows = [[str(project.id), str(project.name), str(project.capacity), f'Facility ({soco_fuels[str(project.fuel)]})',
+            str(project.submitted_date.date()) if pd.notna(project.submitted_date) else '',
+            str(project.service_date.date()) if pd.notna(project.service_date) else '',
+            f'{project.county} County, {project.state}']
+            for project in projects.itertuples()]
+    with open(f'{fixture_dir}/{soco_grid_file}', 'w') as f:
+        json.dump({'data': rows, 'columns': columns}, f)
+    print(f'Wrote synthetic fixtures to {fixture_dir}')
+
+def synthesizeCounties(projects):
+    # Without the real county layer, a square for each county in the queues stands in for it
+    # so the spatial join still runs on the same number of counties
+    join_keys = projects['join_key'].dropna().unique()
+    squares = [box(i % 100, i // 100, i % 100 + 1, i // 100 + 1) for i in range(len(join_keys))]
+    counties = gpd.GeoDataFrame({'join_key': join_keys}, geometry=squares, crs='EPSG:4326').set_index('join_key')
+    counties.to_feather(counties_feather, compression='uncompressed')
+
+#### Patching the source modules ####
+
+class FakeBrowserPool:
+    @contextmanager
+    def page(self):
+        yield None
+
+@contextmanager
+def workingCopy():
+    # Every run happens in a copy of the data folders, so the real backups and settings are never touched
+    repo_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        shutil.copytree('data/individual_queues', f'{temp_dir}/data/individual_queues')
+        shutil.copytree('scripts/script_data', f'{temp_dir}/scripts/script_data', ignore=shutil.ignore_patterns('benchmark'))
+        if os.path.exists(counties_feather):
+            shutil.copy(counties_feather, f'{temp_dir}/{counties_feather}')
+        os.chdir(temp_dir)
+        try:
+            yield
+        finally:
+            os.chdir(repo_dir)
+
+def patchSources(session, errors):
+    # Errors are collected instead of emailed
+    def recordError(subject, message):
+        errors.append(f'{subject}: {message}')
+    for name, module, files in benchmark_sources:
+        if hasattr(module, 'sendEmail'):
+            module.sendEmail = recordError
+    sources.sendEmail = recordError
+    utils.sendEmail = recordError
+    utils.session = session
+
+    # Duke and TVA only download a report when findNewURL finds a new one, so point them at the current report
+    def currentURL(utility):
+        download_settings = pd.read_csv('scripts/script_data/download_settings.csv', index_col='name', dtype=str)
+        settings = download_settings.loc[utility]
+        date = pd.to_datetime(settings['last_updated'], format='%m/%d/%Y')
+        return settings['base_url'].format(date.strftime(settings['date_format']))
+    duke.findNewURL = currentURL
+    tva.findNewURL = currentURL
+
+def recordFixtures():
+    # Runs every source against the live endpoints, saving the raw payloads as fixtures
+    os.makedirs(fixture_dir, exist_ok=True)
+    errors = []
+    scrape = soco2.scrapeSOCOGrid
+    def recordGrid(driver):
+        data, col_names = scrape(driver)
+        with open(f'{fixture_dir}/{soco_grid_file}', 'w') as f:
+            json.dump({'data': data, 'columns': col_names}, f)
+        print(f'Recorded {soco_grid_file}')
+        return data, col_names
+    with workingCopy():
+        patchSources(RecordingSession(utils.getSession()), errors)
+        soco2.scrapeSOCOGrid = recordGrid
+        for name, module, files in benchmark_sources:
+            sources.buildQueue(module.source)
+    for error in errors:
+        print(error)
+
+#### Measuring ####
+
+def measure(function, repeats):
+    # The fastest of several runs is used for time, since it is the least affected by noise
+    # Peak memory is measured on one extra run, because tracing memory slows everything down
+    # One untimed run comes first, so one-time costs (imports, caches, lazy setup) are not counted
+    function()
+    times = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    function()
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, {'seconds': min(times), 'peak_mb': peak_memory / 1e6}
+
+def scaleQueue(projects, factor):
+    # Makes a larger queue by repeating every project with a new id
+    copies = []
+    for i in range(factor):
+        copy = projects.copy()
+        copy['id'] = copy['id'] + f'_{i}'
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+def runBenchmarks(repeats):
+    results = {}
+    errors = []
+    queues = []
+
+    with workingCopy():
+        patchSources(ReplaySession(), errors)
+        soco2.getBrowserPool = lambda: FakeBrowserPool()
+
+        #### Source transforms ####
+
+        for name, module, files in benchmark_sources:
+            missing = [file_name for file_name in files if not os.path.exists(f'{fixture_dir}/{file_name}')]
+            if missing:
+                print(f'Skipping {name}, missing fixtures: {", ".join(missing)}')
+                continue
+            if soco_grid_file in files:
+                with open(f'{fixture_dir}/{soco_grid_file}') as f:
+                    grid = json.load(f)
+                soco2.scrapeSOCOGrid = lambda driver: (grid['data'], grid['columns'])
+
+            # A source that fails falls back to its backup, which would make it look fast
+            errors.clear()
+            queue, results[f'source:{name}'] = measure(lambda: sources.buildQueue(module.source), repeats)
+            if errors:
+                results[f'source:{name}']['error'] = errors[0]
+                print(f'{name} failed, its timing is not used: {errors[0].splitlines()[0]}')
+            else:
+                # The number of projects is kept too, so a parser that starts dropping rows is caught
+                results[f'source:{name}']['rows'] = len(queue)
+                queues.append(queue)
+
+        #### Aggregation and spatial join ####
+
+        # Without any fixtures, the aggregation is benchmarked on the backups
+        if not queues:
+            queues = [utils.readBackup(source['name']) for source in sources.loadSources()]
+        projects = utils.enforceSchema(pd.concat([utils.enforceSchema(utils.splitCounties(queue)) for queue in queues]))
+
+        for factor in scale_factors:
+            scaled_projects = scaleQueue(projects, factor)
+            typed_projects, results[f'enforce_schema:x{factor}'] = measure(lambda: utils.enforceSchema(scaled_projects), repeats)
+            county_data, results[f'aggregate:x{factor}'] = measure(lambda: aggregateCounties(buildCountyPartials(typed_projects)), repeats)
+
+        if not os.path.exists(counties_feather):
+            print(f'{counties_feather} does not exist, using a synthetic county layer')
+            synthesizeCounties(projects)
+        county_data = aggregateCounties(buildCountyPartials(projects))
+        spatial_join = lambda: loadCounties().join(county_data.set_index('join_key'), how='left')
+        spatialized, results['spatial_join'] = measure(spatial_join, repeats)
+
+    return results
+
+def compareToBaseline(results, baseline, tolerance):
+    # A stage counts as a regression if it got slower or used more memory by more than the tolerance
+    # Very small differences in time and memory are ignored, since they are mostly noise
+    # A source that fails, or returns a different number of projects from the same fixtures, is always a regression
+    regressions = []
+    for stage, result in results.items():
+        if 'error' in result:
+            regressions.append(f'{stage}: failed with {result["error"].splitlines()[0]}')
+            continue
+        if stage not in baseline:
+            continue
+        base = baseline[stage]
+        if ('rows' in base) and (result.get('rows') != base['rows']):
+            regressions.append(f'{stage}: {base["rows"]} projects -> {result.get("rows")} projects')
+        if (result['seconds'] > base['seconds'] * (1 + tolerance)) and (result['seconds'] - base['seconds'] > 0.05):
+            regressions.append(f'{stage}: {base["seconds"]:.3f}s -> {result["seconds"]:.3f}s')
+        if (result['peak_mb'] > base['peak_mb'] * (1 + tolerance)) and (result['peak_mb'] - base['peak_mb'] > 1):
+            regressions.append(f'{stage}: {base["peak_mb"]:.1f} MB -> {result["peak_mb"]:.1f} MB')
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark each stage of the pipeline against saved payloads')
+    parser.add_argument('--record', action='store_true', help='download fresh fixtures from the live endpoints first')
+    parser.add_argument('--synthesize', action='store_true', help='build fixtures from the committed backups first')
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the new baseline')
+    parser.add_argument('--repeats', type=int, default=3, help='number of timed runs of each stage')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown before a stage is flagged')
+    parser.add_argument('--output', help='also write the results to this JSON file')
+    args = parser.parse_args()
+
+    if args.record:
+        recordFixtures()
+    if args.synthesize:
+        synthesizeFixtures()
+
+    results = runBenchmarks(args.repeats)
+
+    print(f'{"stage":<28}{"seconds":>10}{"peak MB":>10}')
+    for stage, result in results.items():
+        print(f'{stage:<28}{result["seconds"]:>10.3f}{result["peak_mb"]:>10.1f}')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        os.makedirs(benchmark_dir, exist_ok=True)
+        with open(baseline_path, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'Saved baseline to {baseline_path}')
+        return
+
+    if os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        regressions = compareToBaseline(results, baseline, args.tolerance)
+        if regressions:
+            print('Regressions against the baseline:')
+            for regression in regressions:
+                print(f'  {regression}')
+            sys.exit(1)
+        print('No regressions against the baseline')
+
+if __name__ == "__main__":
+    main()
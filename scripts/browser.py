@@ -0,0 +1,129 @@
+import atexit
+import threading
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+
+from config import chromedriver_path, browser_max_pages, browser_page_timeout
+
+class BrowserPool:
+
+    # Keeps headless Chrome instances running between pages
+    # Any source that scrapes a web page borrows a browser with page(), and gives it back when it is done,
+    # so only the first page of a run pays for starting Chrome
+    def __init__(self, max_pages = browser_max_pages, page_timeout = browser_page_timeout):
+        self.max_pages = max_pages
+        self.page_timeout = page_timeout
+        # Limits how many pages can be open at the same time
+        self.slots = threading.BoundedSemaphore(max_pages)
+        # Also used to wait for browsers that warm() is still starting
+        self.lock = threading.Condition()
+        self.drivers = []
+        self.idle_drivers = []
+        self.starting = 0
+        self.closed = False
+
+    def startDriver(self):
+        #### Configure options for web driver
+        options = webdriver.ChromeOptions()
+        options.add_argument("--headless")
+        options.add_argument("--window-size=1920x1080")  # Open the browser in maximized mode
+        options.add_argument("--no-sandbox")  # Bypass OS security model
+        options.add_argument("--disable-dev-shm-usage")  # Overcome limited resource problems
+        driver = webdriver.Chrome(service=Service(chromedriver_path), options=options)
+        # No single page load or script is allowed to hang the browser
+        driver.set_page_load_timeout(self.page_timeout)
+        driver.set_script_timeout(self.page_timeout)
+        with self.lock:
+            self.drivers.append(driver)
+        return driver
+
+    def warm(self, count = 1):
+        # Starts browsers in the background, so the first page does not have to wait for Chrome to start from scratch
+        # page() waits for a browser that is still starting instead of starting another one
+        count = min(count, self.max_pages)
+        with self.lock:
+            self.starting += count
+        def start():
+            for i in range(count):
+                driver = None
+                try:
+                    driver = self.startDriver()
+                except Exception as e:
+                    # page() will try again when it needs a browser
+                    print(f'Could not start a browser ahead of time: {e}')
+                with self.lock:
+                    self.starting -= 1
+                    if driver is not None:
+                        self.idle_drivers.append(driver)
+                    self.lock.notify_all()
+        threading.Thread(target = start, name = 'browser-warm', daemon = True).start()
+
+    @contextmanager
+    def page(self):
+        if not self.slots.acquire(timeout = self.page_timeout):
+            raise TimeoutError(f'No browser became available within {self.page_timeout} seconds')
+        driver = None
+        try:
+            with self.lock:
+                if self.closed:
+                    raise RuntimeError('The browser pool has already been shut down')
+                self.lock.wait_for(lambda: self.idle_drivers or (self.starting == 0), timeout = self.page_timeout)
+                if self.idle_drivers:
+                    driver = self.idle_drivers.pop()
+            if driver is None:
+                driver = self.startDriver()
+            yield driver
+        except Exception:
+            # A page that failed may have left the browser in a bad state, so it is not reused
+            if driver is not None:
+                self.discard(driver)
+                driver = None
+            raise
+        finally:
+            if driver is not None:
+                self.release(driver)
+            self.slots.release()
+
+    def release(self, driver):
+        # Clear the page before the browser gets used again
+        try:
+            driver.delete_all_cookies()
+            driver.get('about:blank')
+        except Exception:
+            self.discard(driver)
+            return
+        with self.lock:
+            self.idle_drivers.append(driver)
+
+    def discard(self, driver):
+        with self.lock:
+            if driver in self.drivers:
+                self.drivers.remove(driver)
+            if driver in self.idle_drivers:
+                self.idle_drivers.remove(driver)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def shutdown(self):
+        # Quits every browser the pool has started
+        with self.lock:
+            self.closed = True
+            drivers = list(self.drivers)
+        for driver in drivers:
+            self.discard(driver)
+
+# One pool is shared by every scraped source
+browser_pool = None
+browser_pool_lock = threading.Lock()
+
+def getBrowserPool():
+    global browser_pool
+    with browser_pool_lock:
+        if browser_pool is None:
+            browser_pool = BrowserPool()
+            # Make sure no Chrome process is left running when the script ends
+            atexit.register(browser_pool.shutdown)
+    return browser_pool
@@ -0,0 +1,57 @@
+import json
+import numpy as np
+import pandas as pd
+
+from aggregate import fuel_columns
+from config import class_counts
+
+# Class breaks for each map layer, for building legends
+class_breaks_path = 'data/class_breaks.json'
+
+# Each total gets a class property with the same name, e.g. total_solar -> class_solar
+class_fields = {field: field.replace('total_', 'class_') for field in class_counts}
+
+# When two fuels tie for the most capacity, the one checked last here wins
+# This is the order the leading fuel layer in script.js has always checked them in
+leading_fuel_tie_order = ['total_solar', 'total_hybrid', 'total_wind', 'total_storage', 'total_natural_gas', 'total_other']
+
+def classifyCounties(county_data):
+    # Adds a small integer class to each county for every map layer, so the page only has to look up a color
+    # Classes are quantiles of the counties that have any capacity of that type, numbered from 1 (lowest)
+    # Counties without any capacity of that type get class 0
+    # Returns the county data with the classes added, and the upper bound of each class (None for classes no county is in)
+    county_data = county_data.copy()
+    breaks = {}
+    for field, class_field in class_fields.items():
+        values = county_data[field]
+        has_capacity = values > 0
+        class_count = class_counts[field]
+        county_data[class_field] = 0
+        breaks[field] = [None] * class_count
+        if has_capacity.any():
+            # When many counties have the same total, qcut returns fewer classes than asked for
+            # (or none at all if every total is the same), so the classes it returns are spread
+            # over every color of the layer, with the lowest still 1 and the highest still class_count
+            classes, bins = pd.qcut(values[has_capacity], class_count, labels = False, retbins = True, duplicates = 'drop')
+            upper_bounds = bins[1:] if len(bins) > 1 else bins
+            if len(upper_bounds) > 1:
+                class_codes = np.round(np.arange(len(upper_bounds)) * (class_count - 1) / (len(upper_bounds) - 1)).astype(int) + 1
+            else:
+                class_codes = np.array([class_count])
+            county_data.loc[has_capacity, class_field] = class_codes[classes.fillna(0).astype(int).to_numpy()]
+            for class_code, upper_bound in zip(class_codes, upper_bounds):
+                breaks[field][class_code - 1] = round(float(upper_bound), 3)
+        county_data[class_field] = county_data[class_field].astype('int8')
+
+    # The fuel with the most capacity in each county, numbered from 1 in the order of fuel_columns
+    # Ties are broken with leading_fuel_tie_order, so the map looks the same as it always has
+    fuel_codes = {column: code for code, column in enumerate(fuel_columns.values(), start = 1)}
+    fuel_values = county_data[leading_fuel_tie_order].to_numpy()
+    leading = len(leading_fuel_tie_order) - 1 - np.argmax(fuel_values[:, ::-1], axis = 1)
+    leading_fuel = np.array([fuel_codes[column] for column in leading_fuel_tie_order])[leading]
+    county_data['leading_fuel'] = np.where(county_data['total_capacity'] > 0, leading_fuel, 0).astype('int8')
+    return county_data, breaks
+
+def writeClassBreaks(breaks):
+    with open(class_breaks_path, 'w') as f:
+        json.dump({'breaks': breaks, 'leading_fuel': list(fuel_columns)}, f, indent = 2)
@@ -1,3 +1,5 @@
+import os
+
 standard_fields = ['id',
                     'name', 
                     'capacity', 
@@ -14,3 +16,153 @@ standard_fuels = ['Solar',
                 'Wind', 
                 'Natural Gas', 
                 'Other']
+
+# Modules in scripts/ that each describe one queue (see sources.py), in the order the queues are combined
+# To add a queue, write a module with a source dictionary, list it here, and add its fuel types to fuel_maps
+# soco.py and tva.py are older versions of the SoCo and TVA sources that read PDF reports
+source_modules = ['miso', 'pjm', 'isone', 'nyiso', 'soco2', 'tva2', 'duke']
+
+# Number of sources that are allowed to download/parse at the same time
+# Every source spends most of its time waiting on a server, a JVM (tabula) or a browser (selenium),
+# so running them side by side makes the fetch step take about as long as the slowest source
+fetch_workers = 7
+
+# Maximum number of seconds each source is allowed to run before falling back to its backup data
+# Keys match the names of the backup files in data/individual_queues
+fetch_timeouts = {'miso': 300,
+                'pjm': 300,
+                'isone': 300,
+                'nyiso': 300,
+                'soco': 900,
+                'tva': 600,
+                'duke': 900}
+default_fetch_timeout = 600
+
+# Settings for the shared HTTP session used by every source
+# Timeouts are (connect, read) in seconds
+http_timeout = (10, 120)
+# Number of times a failed request is retried, waiting backoff * 2^n seconds in between
+http_retries = 3
+http_backoff = 2
+# Number of connections kept open to each host
+http_pool_size = 16
+
+# Settings for finding newly posted reports in findNewURL
+# Number of dates that get checked at the same time
+url_probe_workers = 16
+# Number of days before the last checked date that get checked again,
+# in case a report was posted a few days after the date in its name
+url_recheck_days = 7
+
+# Rules used to turn the fuel types reported by each source into the standard fuel types
+# 'codes' are exact matches, 'patterns' are regular expressions that are checked in order
+# Anything that does not match becomes 'Other'
+fuel_maps = {'miso': {'codes': {'Solar': 'Solar',
+                                'Battery Storage': 'Storage',
+                                'Hybrid': 'Solar+Storage', # Will need to add more logic to this to improve accuracy
+                                'Wind': 'Wind',
+                                'Gas': 'Natural Gas'}},
+            'pjm': {'codes': {'Solar': 'Solar',
+                                'Storage': 'Storage',
+                                'Solar; Storage': 'Solar+Storage',
+                                'Wind': 'Wind',
+                                'Offshore Wind': 'Wind',
+                                'Natural Gas': 'Natural Gas'}},
+            'isone': {'codes': {'SUN': 'Solar',
+                                'BAT': 'Storage',
+                                'SUN BAT': 'Solar+Storage',
+                                'WND': 'Wind',
+                                'NG': 'Natural Gas'}},
+            'nyiso': {'codes': {'S': 'Solar',
+                                'ES': 'Storage',
+                                'CR': 'Solar+Storage',
+                                'W': 'Wind',
+                                'OSW': 'Wind',
+                                'NG': 'Natural Gas'}},
+            # SoCo lists every fuel of a project in one string, so the first pattern that matches wins
+            'soco': {'patterns': [('Natural Gas', 'Natural Gas'),
+                                ('Wind', 'Wind'),
+                                ('Solar.*Batteries|Batteries.*Solar', 'Solar+Storage'),
+                                ('Solar', 'Solar'),
+                                ('Batteries', 'Storage')]},
+            'tva': {'codes': {'Solar': 'Solar',
+                                'Energy\rStorage': 'Storage',
+                                'Solar +\rStorage': 'Solar+Storage',
+                                'Wind': 'Wind',
+                                'Gas': 'Natural Gas'}},
+            'duke': {'codes': {'Solar': 'Solar',
+                                'Battery': 'Storage',
+                                'Solar+Storage': 'Solar+Storage',
+                                'Wind': 'Wind',
+                                'Natural Gas': 'Natural Gas'}}}
+
+# Types for every column of a standardized queue
+# Columns with only a handful of distinct values are stored as categories,
+# which keeps memory use down and lets the county aggregation group on integer codes
+project_schema = {'id': 'string',
+                'name': 'string',
+                'capacity': 'float32',
+                'fuel': 'category',
+                'submitted_date': 'datetime64[ns]',
+                'service_date': 'datetime64[ns]',
+                'county': 'category',
+                'state': 'category',
+                'transmission_owner': 'category',
+                'iso_utility': 'category',
+                'join_key': 'category'}
+
+# Backups are stored as parquet files in data/individual_queues, with a CSV copy next to each one
+# Hand edits go in the CSV: readBackup reads the CSV instead of the parquet file whenever it has changed since it was written
+# Set this to False to stop writing the CSV copy of each backup, the parquet file is then always read and any CSV left behind is ignored
+backup_csv_mirror = True
+
+# Settings for the headless browsers used by scraped sources (see browser.py)
+# The workflow sets CHROMEDRIVER_BIN to the chromedriver it installs
+chromedriver_path = os.environ.get('CHROMEDRIVER_BIN', '/usr/bin/chromedriver')
+# Maximum number of pages that can be open at the same time
+browser_max_pages = 2
+# Number of seconds a page is allowed to take to load, or a script to run
+browser_page_timeout = 120
+
+# Number of workers that parse the pages of a PDF at the same time (see pdfs.py)
+pdf_workers = 4
+
+# Every run writes a report of how long each stage took for each source (see metrics.py)
+run_report_path = 'data/run_report.json'
+# Each report is also added to this file, one line per run, so slow sources can be followed over time
+run_history_path = 'data/run_history.jsonl'
+# Set METRICS_TEXTFILE to also write the report in the Prometheus textfile format
+metrics_textfile = os.environ.get('METRICS_TEXTFILE')
+
+# Projects that list more than one county are split evenly across them (see splitCounties in utils.py)
+# Separators that can appear between the counties of a single project
+county_separators = r'\s*(?:,|/|;|&|\s+and\s+)\s*'
+# Counties whose names contain one of the separators, so they are never split
+separator_county_names = ['King and Queen', 'King & Queen', 'Lewis and Clark', 'Lake and Peninsula']
+
+# Vector tiles of the county data, written as a PMTiles archive for the map (see tiles.py)
+# Tiles are built for every zoom level from tile_min_zoom to tile_max_zoom, the map stretches the last level past that
+tile_min_zoom = 3
+tile_max_zoom = 8
+# Outlines are simplified until they are off by at most this many pixels at each zoom level
+tile_tolerance_px = 0.5
+# Each tile also includes this many pixels of the tiles around it, so outlines do not show seams at tile edges
+tile_buffer_px = 4
+
+# Number of classes the counties are split into for each map layer (see classes.py)
+# These must match the number of colors for each layer in script.js
+class_counts = {'total_capacity': 7,
+                'total_solar': 5,
+                'total_hybrid': 5,
+                'total_storage': 5,
+                'total_wind': 5,
+                'total_natural_gas': 5,
+                'total_other': 5}
+
+# Settings for agg_county_data.geojson (see geometry.py)
+# Outlines are simplified to within this many degrees (about 500 m), borders shared by two counties stay aligned
+county_simplify_tolerance = 0.005
+# Number of decimal places kept in each coordinate (5 places is about 1 m)
+county_coordinate_precision = 5
+# Also write agg_county_data.topojson, this needs the topojson package
+write_topojson = False
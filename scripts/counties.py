@@ -0,0 +1,46 @@
+import os
+import pyarrow as pa
+import pyarrow.feather as feather
+import geopandas as gpd
+
+from utils import createJoinKey, fileHash
+
+# Pre-cleaned spatial layer of US counties
+counties_geojson = 'data/simplified_counties.geojson'
+# Same layer stored in a binary format, with join_key already created and used as the index
+# It is rebuilt from the GeoJSON whenever needed, so it is not committed (see .gitignore)
+counties_feather = 'data/simplified_counties.feather'
+
+def prepareCounties():
+    # Parsing the GeoJSON and cleaning up every county name is one of the slowest steps of a run,
+    # so it only needs to happen once, whenever the county layer itself changes
+    counties = gpd.read_file(counties_geojson)
+    counties = createJoinKey(counties)
+    counties = counties.set_index('join_key')
+    # The hash of the GeoJSON is kept in the file's metadata, so a changed layer is noticed even when
+    # file times are not reliable (a fresh checkout gives every file the same time)
+    # Written without compression so the columns can be memory-mapped instead of copied,
+    # the outlines are still decoded from WKB when the file is read
+    counties.to_feather(counties_feather, compression = 'uncompressed')
+    table = feather.read_table(counties_feather)
+    metadata = dict(table.schema.metadata)
+    metadata[b'geojson_sha256'] = fileHash(counties_geojson).encode()
+    feather.write_feather(table.replace_schema_metadata(metadata), counties_feather, compression = 'uncompressed')
+    return counties
+
+def countiesGeoJSONHash():
+    # Hash of the GeoJSON the binary copy was made from
+    with pa.memory_map(counties_feather) as source:
+        metadata = pa.ipc.open_file(source).schema.metadata or {}
+    return metadata.get(b'geojson_sha256', b'').decode()
+
+def loadCounties():
+    # Create the binary copy the first time this is run, or if the GeoJSON has changed since
+    if not os.path.exists(counties_feather):
+        return prepareCounties()
+    if os.path.exists(counties_geojson) and (fileHash(counties_geojson) != countiesGeoJSONHash()):
+        return prepareCounties()
+    return gpd.read_feather(counties_feather, memory_map = True)
+
+if __name__ == "__main__":
+    prepareCounties()
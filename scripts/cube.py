@@ -0,0 +1,93 @@
+import os
+import json
+import shutil
+import pandas as pd
+
+# Pre-aggregated capacity for the map, so the page can show totals without loading every project
+# Every table in the cube is cut by fuel, iso_utility and queue_year (the year the project entered the queue)
+# script.js reads the county tiles for the queue year chart and project count in each county pop-up
+cube_dir = 'data/cube'
+
+# Columns every level of the cube is broken down by
+cube_dimensions = ['iso_utility', 'fuel', 'queue_year']
+
+def buildCube(projects):
+    # Returns the three levels of the cube: counties, states and ISOs/utilities
+    # Capacity is summed in float64 so the totals do not lose precision
+    projects = projects.assign(capacity = projects['capacity'].astype('float64'),
+                                queue_year = projects['submitted_date'].dt.year.astype('Int16'),
+                                state = projects['state'].astype('string').str.upper())
+
+    def summarize(keys):
+        # Projects without a queue date are kept, with an empty queue_year
+        # A project split across several counties has one row per county (see splitCounties in utils.py),
+        # so projects are counted by unique id, which is unique within each iso_utility
+        return (projects.groupby(keys, observed = True, dropna = False)
+                .agg(capacity = ('capacity', 'sum'), projects = ('id', 'nunique'))
+                .reset_index())
+
+    # The county level is the finest cut, the other two are rollups of it
+    counties = summarize(['state', 'join_key'] + cube_dimensions)
+    counties = counties[counties['join_key'].notna() & counties['state'].notna()]
+    states = summarize(['state'] + cube_dimensions)
+    isos = summarize(cube_dimensions)
+    return counties, states, isos
+
+def encodeTile(table, dimensions):
+    # Writes a table as columns instead of records, which keeps the JSON small
+    # Each dimension is stored once as a list of values, and every row points to a value by its position
+    # A position of -1 means the value is missing
+    tile = {'dimensions': {}, 'columns': {}}
+    for dimension in dimensions:
+        codes, values = pd.factorize(table[dimension].astype(object), sort = True)
+        tile['dimensions'][dimension] = [value.item() if hasattr(value, 'item') else value for value in values]
+        tile['columns'][dimension] = codes.tolist()
+    tile['columns']['capacity'] = table['capacity'].round(3).tolist()
+    tile['columns']['projects'] = table['projects'].tolist()
+    return tile
+
+def writeTile(tile, path):
+    # Written without any whitespace
+    with open(path, 'w') as f:
+        json.dump(tile, f, separators = (',', ':'))
+    return os.path.getsize(path)
+
+def writeCube(projects, states = None):
+    # States limits the county tiles that are rewritten to those states (lower case, like the end of a join_key),
+    # None rewrites every tile
+    # The state and ISO/utility tiles are small rollups of every project, so they are always rewritten
+    counties, state_totals, isos = buildCube(projects)
+    manifest_path = f'{cube_dir}/manifest.json'
+    tiles = {}
+
+    # Counties are split into one tile per state, so the page only loads the states it shows
+    # Tiles are rewritten from scratch, so a state that no longer has any projects does not keep an old tile
+    # When only some states are rewritten, their old tiles are removed and the other states are left as they are
+    if (states is None) or (not os.path.exists(manifest_path)):
+        shutil.rmtree(f'{cube_dir}/counties', ignore_errors = True)
+        os.makedirs(f'{cube_dir}/counties', exist_ok = True)
+    else:
+        with open(manifest_path) as f:
+            tiles = json.load(f)['tiles']
+        for state in states:
+            tiles.pop(f'counties/{state}', None)
+            if os.path.exists(f'{cube_dir}/counties/{state}.json'):
+                os.remove(f'{cube_dir}/counties/{state}.json')
+        counties = counties[counties['state'].str.lower().isin(states)]
+
+    manifest = {'dimensions': cube_dimensions,
+                'fuels': sorted(projects['fuel'].dropna().unique().tolist()),
+                'queue_years': sorted(int(year) for year in projects['submitted_date'].dt.year.dropna().unique()),
+                'tiles': tiles}
+    manifest['tiles']['states'] = {'rows': len(state_totals), 'bytes': writeTile(encodeTile(state_totals, ['state'] + cube_dimensions), f'{cube_dir}/states.json')}
+    manifest['tiles']['isos'] = {'rows': len(isos), 'bytes': writeTile(encodeTile(isos, cube_dimensions), f'{cube_dir}/isos.json')}
+    for state, state_counties in counties.groupby('state', observed = True):
+        path = f'{cube_dir}/counties/{state.lower()}.json'
+        size = writeTile(encodeTile(state_counties, ['join_key'] + cube_dimensions), path)
+        manifest['tiles'][f'counties/{state.lower()}'] = {'rows': len(state_counties), 'bytes': size}
+
+    manifest['tiles'] = dict(sorted(manifest['tiles'].items()))
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent = 2)
+    print(f'Wrote {len(manifest["tiles"])} cube tiles, {sum(tile["bytes"] for tile in manifest["tiles"].values()) / 1e3:.0f} kB in total')
+    return manifest
@@ -0,0 +1,122 @@
+import os
+import time
+import sqlite3
+import argparse
+import pandas as pd
+
+from config import project_schema
+
+# Local SQLite copy of the standardized projects and the county data, for questions the map does not answer
+# It is rebuilt at the end of every run that has new data, and is not committed (see .gitignore)
+database_path = 'data/gi_queue.sqlite'
+
+# The queues have one row for each county of a project (see splitCounties in utils.py),
+# so the database has one row per project in projects, and one row per county of each project in project_counties
+# Projects are told apart by their source, id and ISO/utility, the same way as in snapshots.py
+project_key = ['source', 'id', 'iso_utility']
+
+# Columns that queries filter and group on, each gets an index
+indexed_columns = {'projects': ['state', 'fuel', 'iso_utility'],
+                    'project_counties': ['project_id', 'join_key']}
+
+# Columns that summarize() can group the projects by
+# Grouping by join_key uses the share of each project's capacity that is in each county
+group_columns = ['transmission_owner', 'queue_year', 'state', 'fuel', 'iso_utility', 'join_key']
+
+def projectTables(queues):
+    # Queues is a dictionary of standardized queues named after their source
+    # Categories are written as plain text and dates as YYYY-MM-DD, which SQLite compares correctly
+    rows = pd.concat([queue.assign(source = source) for source, queue in queues.items()], ignore_index = True)
+    rows = rows[['source'] + list(project_schema)]
+    for column, dtype in project_schema.items():
+        if dtype == 'category':
+            rows[column] = rows[column].astype('string')
+    rows['capacity'] = rows['capacity'].astype('float64')
+    rows['project_id'] = rows.groupby(project_key, dropna = False, sort = False).ngroup() + 1
+
+    # The counties of a project are put back together, and its capacity is the total of its split rows
+    grouped = rows.groupby('project_id', sort = True)
+    projects = grouped[['source', 'id', 'name', 'fuel', 'submitted_date', 'service_date',
+                        'state', 'transmission_owner', 'iso_utility']].first()
+    projects['capacity'] = grouped['capacity'].sum()
+    projects['county'] = grouped['county'].agg(lambda counties: ', '.join(counties.dropna().unique()))
+    projects['queue_year'] = projects['submitted_date'].dt.year.astype('Int16')
+    for column in ['submitted_date', 'service_date']:
+        projects[column] = projects[column].dt.strftime('%Y-%m-%d')
+    projects = projects.reset_index()
+
+    project_counties = rows[['project_id', 'county', 'state', 'join_key', 'capacity']]
+    return projects, project_counties
+
+def writeDatabase(queues, counties):
+    # Counties is the spatialized county data, the outlines are left out
+    started = time.perf_counter()
+    projects, project_counties = projectTables(queues)
+    counties = pd.DataFrame(counties.drop(columns = 'geometry'))
+
+    # Built in a separate file and swapped in at the end, so a query running during the build still sees the old copy
+    build_path = f'{database_path}.building'
+    if os.path.exists(build_path):
+        os.remove(build_path)
+    with sqlite3.connect(build_path) as connection:
+        projects.to_sql('projects', connection, index = False)
+        project_counties.to_sql('project_counties', connection, index = False)
+        counties.to_sql('counties', connection, index = False)
+        connection.execute('CREATE UNIQUE INDEX projects_project_id ON projects (project_id)')
+        for table, columns in indexed_columns.items():
+            for column in columns:
+                connection.execute(f'CREATE INDEX {table}_{column} ON {table} ({column})')
+        connection.execute('CREATE UNIQUE INDEX counties_join_key ON counties (join_key)')
+        connection.execute('ANALYZE')
+    connection.close()
+    os.replace(build_path, database_path)
+    print(f'Wrote {len(projects)} projects and {len(counties)} counties to {database_path} in {time.perf_counter() - started:.1f} seconds')
+
+def query(sql, parameters = ()):
+    # Runs any SQL against the database and returns the result as a DataFrame
+    with sqlite3.connect(f'file:{database_path}?mode=ro', uri = True) as connection:
+        result = pd.read_sql_query(sql, connection, params = parameters)
+    connection.close()
+    return result
+
+def summarize(by, state = None, fuel = None, iso_utility = None):
+    # Queued capacity and number of projects for each value of a column, largest first
+    # Can be narrowed down to one state, fuel or ISO/utility
+    if by not in group_columns:
+        raise ValueError(f'Cannot group by {by}, use one of {", ".join(group_columns)}')
+    conditions, parameters = [], []
+    for column, value in [('state', state), ('fuel', fuel), ('iso_utility', iso_utility)]:
+        if value is not None:
+            conditions.append(f'projects.{column} = ?')
+            parameters.append(value)
+    where = f'WHERE {" AND ".join(conditions)}' if conditions else ''
+    # A project in several counties counts once in every county it is in, with its share of the capacity there
+    if by == 'join_key':
+        return query(f'SELECT project_counties.join_key, ROUND(SUM(project_counties.capacity), 1) AS capacity, '
+                    f'COUNT(DISTINCT projects.project_id) AS projects '
+                    f'FROM project_counties JOIN projects USING (project_id) {where} '
+                    f'GROUP BY project_counties.join_key ORDER BY capacity DESC', parameters)
+    return query(f'SELECT {by}, ROUND(SUM(capacity), 1) AS capacity, COUNT(*) AS projects '
+                f'FROM projects {where} GROUP BY {by} ORDER BY capacity DESC', parameters)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = 'Query the queued projects without running the pipeline')
+    parser.add_argument('by', nargs = '?', choices = group_columns, help = 'column to total the capacity by')
+    parser.add_argument('--state', help = 'only include projects in this state (like TX)')
+    parser.add_argument('--fuel', help = 'only include projects of this fuel type')
+    parser.add_argument('--iso', dest = 'iso_utility', help = 'only include projects of this ISO/utility')
+    parser.add_argument('--sql', help = 'run this query instead, the tables are projects, project_counties and counties')
+    args = parser.parse_args()
+    if (args.by is None) and (args.sql is None):
+        parser.error('either a column to group by or --sql is needed')
+
+    started = time.perf_counter()
+    if args.sql:
+        result = query(args.sql)
+    else:
+        result = summarize(args.by, state = args.state, fuel = args.fuel, iso_utility = args.iso_utility)
+    elapsed = time.perf_counter() - started
+
+    with pd.option_context('display.max_rows', None, 'display.width', 200):
+        print(result.to_string(index = False))
+    print(f'{len(result)} rows in {elapsed * 1000:.0f} ms')
@@ -0,0 +1,49 @@
+from io import BytesIO
+import pandas as pd
+from openpyxl import load_workbook
+
+import metrics
+
+def readExcel(content, columns, footer_rows = 0):
+    # Reads the first sheet of a workbook one row at a time, using openpyxl's read-only mode
+    # The header row is the first row that contains every name in columns, and only those columns are kept
+    # This avoids loading every cell of the workbook when only a few columns are needed
+    with metrics.stage('parse'):
+        return readRows(content, columns, footer_rows)
+
+def readRows(content, columns, footer_rows):
+    workbook = load_workbook(BytesIO(content), read_only = True, data_only = True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only = True)
+
+        # Find the header row while reading the sheet
+        positions = None
+        for row in rows:
+            if set(columns).issubset(row):
+                positions = [row.index(column) for column in columns]
+                break
+        if positions is None:
+            raise ValueError(f'No header row found with the columns: {", ".join(columns)}')
+
+        # The remaining rows are the data
+        # Blank rows are kept for now, so the footer can be counted from the bottom of the sheet
+        data = []
+        blank = []
+        for row in rows:
+            data.append([row[i] if i < len(row) else None for i in positions])
+            blank.append(all(value is None for value in row))
+    finally:
+        workbook.close()
+
+    # Sheets are often padded with empty rows at the bottom, which are not part of the footer
+    while blank and blank[-1]:
+        data.pop()
+        blank.pop()
+    # Some workbooks have notes at the bottom of the sheet that are not projects,
+    # these are the last footer_rows rows whether or not any of them are blank
+    if footer_rows:
+        data, blank = data[:-footer_rows], blank[:-footer_rows]
+    # Blank rows between the projects are skipped
+    data = [values for values, is_blank in zip(data, blank) if not is_blank]
+
+    return pd.DataFrame(data, columns = columns).infer_objects()
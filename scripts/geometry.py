@@ -0,0 +1,45 @@
+import os
+import shapely
+
+from config import county_simplify_tolerance, county_coordinate_precision, write_topojson
+
+def simplifyCoverage(geometries, tolerance):
+    # Simplifies a set of polygons that share borders, like counties, without opening gaps or overlaps between them
+    # Each shared border is simplified once, so both sides of it end up with the same points
+    # Simplifying each polygon on its own would move the two sides of a border differently,
+    # so there is no fallback: without coverage_simplify the map would have gaps and slivers along every border
+    if not hasattr(shapely, 'coverage_simplify'):
+        raise RuntimeError(f'Simplifying the county outlines needs shapely 2.1 or newer (which needs Python 3.10 or newer), '
+                            f'shapely {shapely.__version__} is installed')
+    return shapely.coverage_simplify(geometries, tolerance)
+
+def countVertices(geometries):
+    return int(shapely.get_num_coordinates(geometries).sum())
+
+def writeCountyGeoJSON(counties, path, tolerance = county_simplify_tolerance, precision = county_coordinate_precision):
+    # Writes the spatialized county data as a compact GeoJSON
+    # Outlines are simplified and coordinates are rounded, properties without a value are left out,
+    # and no whitespace is written
+    geometries = counties.geometry.to_numpy()
+    simplified = simplifyCoverage(geometries, tolerance)
+    # Points are snapped to a grid with the given number of decimal places
+    # Both sides of a shared border snap to the same points, so the borders still line up
+    simplified = shapely.set_precision(simplified, 10 ** -precision)
+    counties = counties.set_geometry(simplified, crs = counties.crs)
+
+    with open(path, 'w') as f:
+        f.write(counties.to_json(na = 'drop', drop_id = True, separators = (',', ':')))
+    print(f'Wrote {path}: {os.path.getsize(path) / 1e6:.2f} MB, {countVertices(geometries)} vertices simplified to {countVertices(simplified)}')
+
+    if write_topojson:
+        writeCountyTopoJSON(counties, path.replace('.geojson', '.topojson'))
+    return counties
+
+def writeCountyTopoJSON(counties, path):
+    # TopoJSON stores each shared border only once, which makes it smaller again
+    # It is optional, so the package is only needed when write_topojson is turned on
+    import topojson
+    # The outlines are already simplified, coordinates are stored as integers on a fine grid
+    topology = topojson.Topology(counties, prequantize = True, toposimplify = False)
+    topology.to_json(path)
+    print(f'Wrote {path}: {os.path.getsize(path) / 1e6:.2f} MB')
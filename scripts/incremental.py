@@ -0,0 +1,139 @@
+import os
+import glob
+import json
+import hashlib
+import pandas as pd
+
+from aggregate import buildCountyPartials, aggregateCounties
+from classes import class_breaks_path
+from cube import cube_dir
+from shards import shard_dir
+from tiles import county_tiles
+
+# Everything needed to update the outputs without rebuilding them is kept here
+# Only the county aggregates, and the project shards and cube tiles of the states they are in, are updated in place
+# The GeoJSON, vector tiles and database are still written in full whenever any source changes
+state_dir = 'data/pipeline_state'
+
+# Files every run publishes
+# If one of them is missing, everything is rebuilt even when no source has changed
+pipeline_outputs = ['data/agg_county_data.geojson',
+                    county_tiles,
+                    class_breaks_path,
+                    f'{shard_dir}/manifest.json',
+                    f'{cube_dir}/manifest.json']
+
+def fingerprintQueue(queue):
+    # Creates a hash of a standardized queue
+    # Values are converted to strings first so the hash does not depend on how the columns were typed
+    row_hashes = pd.util.hash_pandas_object(queue.astype(str), index=False).values
+    fingerprint = hashlib.sha256(row_hashes.tobytes())
+    fingerprint.update(','.join(queue.columns).encode())
+    return fingerprint.hexdigest()
+
+def fingerprintPipeline():
+    # Creates a hash of the pipeline's own code, including the settings in config.py
+    # Any change to how the outputs are built means they all have to be rebuilt, even if the data is the same
+    fingerprint = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), '*.py'))):
+        fingerprint.update(os.path.basename(path).encode())
+        with open(path, 'rb') as f:
+            fingerprint.update(f.read())
+    return fingerprint.hexdigest()
+
+def loadFingerprints():
+    path = f'{state_dir}/fingerprints.json'
+    if not os.path.exists(path):
+        return {'pipeline': None, 'sources': {}}
+    with open(path) as f:
+        fingerprints = json.load(f)
+    # Older state files only have the fingerprint of each source
+    if 'sources' not in fingerprints:
+        return {'pipeline': None, 'sources': fingerprints}
+    return fingerprints
+
+def loadPartials(source):
+    path = f'{state_dir}/{source}_partials.csv'
+    if not os.path.exists(path):
+        return None
+    return pd.read_csv(path)
+
+def loadCountyAggregates():
+    path = f'{state_dir}/county_aggregates.csv'
+    if not os.path.exists(path):
+        return None
+    return pd.read_csv(path)
+
+def updateCountyAggregates(queues, full_rebuild = False):
+
+    # Queues is a dictionary of standardized queues named after their source
+    # Returns the county aggregates, and the names of the sources that changed since the last run
+    # If no source, no code and no setting changed, and every output exists, the aggregates are None
+    # Also returns the states (the last part of each join_key) whose counties changed, or None if everything was rebuilt,
+    # and the state that needs to be saved for the next run
+    fingerprints = {name: fingerprintQueue(queue) for name, queue in queues.items()}
+    old_fingerprints = loadFingerprints()
+    changed = [name for name in queues if fingerprints[name] != old_fingerprints['sources'].get(name)]
+
+    old_aggregates = loadCountyAggregates()
+    if old_aggregates is None:
+        full_rebuild = True
+    # Code or settings that changed since the last run can change every output
+    pipeline_fingerprint = fingerprintPipeline()
+    if pipeline_fingerprint != old_fingerprints['pipeline']:
+        print('The pipeline has changed since the last run, rebuilding everything')
+        full_rebuild = True
+    missing_outputs = [path for path in pipeline_outputs if not os.path.exists(path)]
+    if missing_outputs:
+        print(f'Missing outputs, rebuilding everything: {", ".join(missing_outputs)}')
+        full_rebuild = True
+    if (not changed) and (not full_rebuild):
+        return None, changed, None, None
+
+    #### Rebuild the partial aggregates of the sources that changed ####
+
+    partials = {}
+    rebuilt = []
+    touched_keys = set()
+    for name, queue in queues.items():
+        old_partials = None if full_rebuild else loadPartials(name)
+        if (name in changed) or (old_partials is None):
+            partials[name] = buildCountyPartials(queue)
+            rebuilt.append(name)
+            # Counties that the source used to have, and counties that it has now, both need to be updated
+            touched_keys.update(partials[name]['join_key'])
+            if old_partials is not None:
+                touched_keys.update(old_partials['join_key'])
+        else:
+            partials[name] = old_partials
+
+    #### Recompute only the counties that changed ####
+
+    all_partials = pd.concat(partials.values(), ignore_index=True)
+    if full_rebuild:
+        county_aggregates = aggregateCounties(all_partials)
+    else:
+        touched_partials = all_partials[all_partials['join_key'].isin(touched_keys)]
+        # Swap out the old rows for those counties with the new ones
+        # Counties that no longer have any projects are simply dropped
+        county_aggregates = old_aggregates[~old_aggregates['join_key'].isin(touched_keys)]
+        if len(touched_partials) > 0:
+            touched_aggregates = aggregateCounties(touched_partials)
+            county_aggregates = pd.concat([county_aggregates, touched_aggregates], ignore_index=True)
+
+    # The state is saved by savePipelineState once the outputs have been written
+    # If the run fails before then, the next run will see the same changes again
+    pipeline_state = {'partials': {name: partials[name] for name in rebuilt},
+                    'county_aggregates': county_aggregates,
+                    'fingerprints': {'pipeline': pipeline_fingerprint, 'sources': fingerprints}}
+
+    touched_states = None if full_rebuild else {key.rsplit('_', 1)[-1] for key in touched_keys if isinstance(key, str)}
+    return county_aggregates, changed, touched_states, pipeline_state
+
+def savePipelineState(pipeline_state):
+    os.makedirs(state_dir, exist_ok=True)
+    for name, partials in pipeline_state['partials'].items():
+        partials.to_csv(f'{state_dir}/{name}_partials.csv', index=False)
+    pipeline_state['county_aggregates'].to_csv(f'{state_dir}/county_aggregates.csv', index=False)
+    with open(f'{state_dir}/fingerprints.json', 'w') as f:
+        json.dump(pipeline_state['fingerprints'], f, indent=2)
@@ -1,87 +1,126 @@
+import argparse
 import pandas as pd
-import geopandas as gpd
-import miso, pjm, isone, nyiso, soco2, tva2, duke
-
-from utils import createJoinKey, sendEmail
-
-def main():
+import metrics
+
+from utils import sendEmail, enforceSchema
+from counties import loadCounties
+from scheduler import fetchQueues
+from sources import loadSources
+from incremental import updateCountyAggregates, savePipelineState
+from cube import writeCube
+from shards import writeProjectShards
+from tiles import writeCountyTiles
+from geometry import writeCountyGeoJSON
+from classes import classifyCounties, writeClassBreaks, class_fields
+from snapshots import recordSnapshots, summarizeChanges
+from database import writeDatabase
+
+def main(full_rebuild = False):
 
     #### Download dataframes from all ISOs/utilties ####
 
+    # Every source module listed in config.py, each named after its backup file in data/individual_queues
+    sources = loadSources()
+
     # Download a copy of each dataset (either new data or copied from backup)
-    miso_queue = miso.getMISOQueue()
-    pjm_queue = pjm.getPJMQueue()
-    isone_queue = isone.getISONEQueue()
-    nyiso_queue = nyiso.getNYISOQueue()
-    soco_queue = soco2.getSOCOQueue()
-    tva_queue = tva2.getTVAQueue()
-    duke_queue = duke.getDukeQueue()
-
-    #### Process the data ####
-
-    # Concatenate the data to create long dataset
-    all_queued_projects = pd.concat([
-        miso_queue, 
-        pjm_queue, 
-        isone_queue, 
-        nyiso_queue, 
-        soco_queue,
-        tva_queue,
-        duke_queue])
-
-    # Sort by control area and capacity
-    # This ensures that the table rendered on the web page looks clean
-    all_queued_projects_sorted = all_queued_projects.sort_values(by = ['iso_utility', 'capacity'], ascending=[True, False])
-    # Export as json for use in interactive web page elements
-    all_queued_projects_sorted.reset_index().to_json(f'data/all_queued_projects.json', index = None, orient = 'records', indent = 2)
-
-    # Aggregate based on county and fuel types
-    # Returns metrics for each fuel type by county
-    all_queued_projects_by_county = (
-        all_queued_projects.groupby(["join_key", "fuel"])["capacity"]
-        .sum()
-        .unstack(fill_value=0)
-        .rename(columns={
-            "Solar": "total_solar",
-            "Solar+Storage": "total_hybrid",
-            "Storage": "total_storage",
-            "Wind": "total_wind",
-            "Natural Gas": "total_natural_gas",
-            "Other": "total_other"
-        })
-        .reset_index()
-    )
-
-    #### Add additional data ###
-
-    # Calculate total queued capacity for each county
-    total_capacity = all_queued_projects.groupby("join_key")["capacity"].sum().rename("total_capacity")
-
-    # Calculate the number of RTOs for each county
-    rto_count = all_queued_projects.groupby("join_key")["iso_utility"].nunique().rename("rto_count")
-
-    # Merge additional metrics into the aggregated DataFrame
-    all_queued_projects_by_county = all_queued_projects_by_county.merge(total_capacity, on="join_key").merge(rto_count, on="join_key").copy()
+    # The sources run at the same time, so this takes as long as the slowest one
+    with metrics.stage('fetch'):
+        queues = fetchQueues(sources)
+
+    #### Aggregate the data ####
+
+    # Only the counties touched by sources with new data get recomputed
+    # If nothing has changed since the last run, there is nothing to update
+    queues = dict(zip([source['name'] for source in sources], queues))
+    with metrics.stage('aggregate'):
+        all_queued_projects_by_county, changed, touched_states, pipeline_state = updateCountyAggregates(queues, full_rebuild = full_rebuild)
+    if all_queued_projects_by_county is None:
+        sendEmail("GI Queue Map", "Execution of main.py successful, no changes found")
+        return 'no_changes'
+    print(f'Sources with new data: {", ".join(changed)}')
+
+    # Keep a dated copy of each queue that changed, and list what changed since its last copy
+    # Use `python scripts/snapshots.py YYYY-MM-DD` to see every change since a date
+    with metrics.stage('snapshots'):
+        queue_changes = recordSnapshots(queues, changed)
+    print(summarizeChanges(queue_changes))
+
+    with metrics.stage('export_projects'):
+        # Concatenate the data to create long dataset
+        # The schema is applied again so the categories of every source get combined
+        all_queued_projects = enforceSchema(pd.concat(queues.values()))
+
+        # Sort by control area and capacity
+        # This ensures that the table rendered on the web page looks clean
+        all_queued_projects_sorted = all_queued_projects.sort_values(by = ['iso_utility', 'capacity'], ascending=[True, False])
+        # Write dates as plain text and round capacity for the web page
+        all_queued_projects_sorted['submitted_date'] = all_queued_projects_sorted['submitted_date'].dt.strftime('%Y-%m-%d')
+        all_queued_projects_sorted['service_date'] = all_queued_projects_sorted['service_date'].dt.strftime('%Y-%m-%d')
+        all_queued_projects_sorted['capacity'] = all_queued_projects_sorted['capacity'].astype('float64').round(3)
+        # Export as json for the project table in each county pop-up
+        # The projects are split into one small file per state, so the page only loads the state it needs
+        # Only the states with changed counties are rewritten
+        writeProjectShards(all_queued_projects_sorted, rewrite_states = touched_states)
+
+    # Pre-aggregated capacity by county, fuel, ISO/utility and queue year, with state and ISO rollups
+    # The page can switch views from these small tiles without loading every project
+    with metrics.stage('export_cube'):
+        writeCube(all_queued_projects, states = touched_states)
+
+    #### Map Classes ####
+
+    # Each county gets a class for every map layer and a code for its leading fuel,
+    # so switching layers on the page is only a color lookup
+    county_data, class_breaks = classifyCounties(all_queued_projects_by_county)
+    writeClassBreaks(class_breaks)
 
     #### Spatializing Queue Data ####
 
-    # Read in pre-cleaned spatial layer of US counties and give it a join_key
-    counties = gpd.read_file(f'data/simplified_counties.geojson')
-    counties = createJoinKey(counties)
+    with metrics.stage('spatial_join'):
+        # Read in pre-cleaned spatial layer of US counties
+        # The layer is already indexed by join_key (see counties.py)
+        counties = loadCounties()
 
-    # Merge county spatial with aggregate county data using join_key
-    joined_data = all_queued_projects_by_county.merge(counties, on = 'join_key', how='outer')
+        # Attach the aggregate county data to each county using the join_key index
+        spatialized_data = counties.join(county_data.set_index('join_key'), how='left').reset_index()
 
-    # Add back geometry
-    spatialized_data = gpd.GeoDataFrame(joined_data, geometry=joined_data['geometry'])
+    # Counties without any projects get class 0 on every map layer
+    class_columns = list(class_fields.values()) + ['leading_fuel']
+    spatialized_data.fillna(value = dict.fromkeys(class_columns, 0), inplace=True)
+    spatialized_data[class_columns] = spatialized_data[class_columns].astype('int8')
 
     # Sort by rto_count to help with rendering in the web page
     spatialized_data.fillna(value = {'rto_count': 0}, inplace=True)
     spatialized_data.sort_values('rto_count', ascending=True, inplace=True)
 
-    # Export as geojson for use in script.js
-    spatialized_data.to_file(f'data/agg_county_data.geojson', driver = 'GeoJSON')
-    sendEmail("GI Queue Map", "Execution of main.py successful")
+    # The outputs below are always written in full, since each one is a single file
+    # Export as geojson, with simplified outlines and rounded coordinates
+    with metrics.stage('export_counties'):
+        writeCountyGeoJSON(spatialized_data, 'data/agg_county_data.geojson')
+
+    # Export as vector tiles, which is what the map in script.js loads
+    with metrics.stage('export_tiles'):
+        writeCountyTiles(spatialized_data)
+
+    # Load the projects and county data into a local database for ad-hoc questions
+    # Use `python scripts/database.py` to query it without running the pipeline again
+    with metrics.stage('export_database'):
+        writeDatabase(queues, spatialized_data)
+
+    # Remember what was built so the next run only has to update what changes
+    savePipelineState(pipeline_state)
+    sendEmail("GI Queue Map", f"Execution of main.py successful\n\n{summarizeChanges(queue_changes)}")
+    return 'success'
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    # By default, only the counties of sources with new data are rebuilt
+    parser.add_argument('--full-rebuild', action='store_true', help='rebuild every county instead of only the ones that changed')
+    args = parser.parse_args()
+    # Every run writes a report of how long each stage and source took, even if the run failed
+    metrics.startRun()
+    status = 'failed'
+    try:
+        status = main(full_rebuild = args.full_rebuild)
+    finally:
+        metrics.finishRun(status)
@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from config import run_report_path, run_history_path, metrics_textfile
+
+# resource is only available on Unix, on other systems peak memory is left out of the report
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# The report for the current run
+run = None
+lock = threading.Lock()
+# Each fetch thread keeps track of which source it is running, and which stage it is in
+# Threads started by a source get the same values through withSourceContext in utils.py
+current = threading.local()
+
+def peakMemory():
+    # Highest memory use of the process so far, in MB
+    # ru_maxrss is already the peak of the whole process, and the sources run side by side,
+    # so it is only reported once for the whole run rather than for each source or stage
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def startRun():
+    global run
+    with lock:
+        run = {'started': datetime.now(timezone.utc).isoformat(timespec = 'seconds'),
+                'start_time': time.perf_counter(),
+                'sources': {},
+                'stages': {}}
+
+def sourceMetrics(source):
+    # Must be called while holding the lock
+    if source not in run['sources']:
+        run['sources'][source] = {'seconds': None,
+                                    'stages': {},
+                                    'bytes_fetched': 0,
+                                    'rows': None,
+                                    'backup_used': False,
+                                    'not_modified': False,
+                                    'error': None}
+    return run['sources'][source]
+
+def update(source, **values):
+    # Records values for a source, or for the source the current thread is running
+    source = source or getattr(current, 'source', None)
+    if (run is None) or (source is None):
+        return
+    with lock:
+        metrics = sourceMetrics(source)
+        for name, value in values.items():
+            if name == 'bytes_fetched':
+                metrics[name] += value
+            else:
+                metrics[name] = value
+
+#### Functions called from the rest of the pipeline ####
+
+@contextmanager
+def trackSource(source):
+    # Everything recorded inside this block, in this thread, is counted towards source
+    current.source = source
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        update(source, seconds = time.perf_counter() - start)
+        current.source = None
+
+@contextmanager
+def stage(name):
+    # Times a block of code
+    # Inside a source, the time is added to that source's stage, otherwise it is a stage of the whole pipeline
+    # Stages inside another stage are not counted separately, so no time is counted twice
+    if (run is None) or getattr(current, 'stage', None):
+        yield
+        return
+    current.stage = name
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        current.stage = None
+        source = getattr(current, 'source', None)
+        with lock:
+            stages = sourceMetrics(source)['stages'] if source else run['stages']
+            stages.setdefault(name, {'seconds': 0})['seconds'] += seconds
+
+def addBytes(count, source = None):
+    update(source, bytes_fetched = count)
+
+def recordRows(count, source = None):
+    update(source, rows = count)
+
+def recordBackup(source = None):
+    update(source, backup_used = True)
+
+def recordNotModified(source = None):
+    update(source, not_modified = True)
+
+def recordError(message, source = None):
+    update(source, error = message)
+
+#### Writing the report ####
+
+def finishRun(status):
+    # Writes the report for this run, adds it to the history, and writes the Prometheus metrics if configured
+    if run is None:
+        return None
+    # A copy is taken, since a source that timed out may still be running
+    with lock:
+        report = json.loads(json.dumps({'started': run['started'],
+                                        'status': status,
+                                        'seconds': time.perf_counter() - run['start_time'],
+                                        'peak_rss_mb': peakMemory(),
+                                        'stages': run['stages'],
+                                        'sources': run['sources']}))
+        # Each source is split into download, parse, clean and standardize stages
+        # Cleaning is whatever time a source spent outside of its other stages
+        for metrics in report['sources'].values():
+            if metrics['seconds'] is not None:
+                other_seconds = sum(values['seconds'] for name, values in metrics['stages'].items() if name != 'clean')
+                metrics['stages']['clean'] = {'seconds': max(metrics['seconds'] - other_seconds, 0)}
+
+    # Print a short summary so the slowest source stands out in the logs
+    print(f'Run {status} in {report["seconds"]:.1f}s')
+    for source, metrics in report['sources'].items():
+        seconds = f'{metrics["seconds"]:.1f}s' if metrics['seconds'] is not None else 'unfinished'
+        backup = ', backup used' if metrics['backup_used'] else ''
+        print(f'  {source}: {seconds}, {metrics["bytes_fetched"]} bytes, {metrics["rows"]} rows{backup}')
+
+    with open(run_report_path, 'w') as f:
+        json.dump(report, f, indent = 2)
+    with open(run_history_path, 'a') as f:
+        f.write(json.dumps(report) + '\n')
+    if metrics_textfile:
+        writeTextfile(report, metrics_textfile)
+    return report
+
+def writeTextfile(report, path):
+    # The Prometheus node exporter reads *.prom files, so the file is written in one step
+    # so that it never sees a half-written file
+    lines = ['# HELP gi_queue_run_seconds Total time of the last run',
+                '# TYPE gi_queue_run_seconds gauge',
+                f'gi_queue_run_seconds {report["seconds"]:.3f}',
+                '# HELP gi_queue_run_success Whether the last run finished',
+                '# TYPE gi_queue_run_success gauge',
+                f'gi_queue_run_success {int(report["status"] != "failed")}',
+                '# HELP gi_queue_stage_seconds Time spent in each stage of the last run',
+                '# TYPE gi_queue_stage_seconds gauge']
+    for name, values in report['stages'].items():
+        lines.append(f'gi_queue_stage_seconds{{source="pipeline",stage="{name}"}} {values["seconds"]:.3f}')
+    for source, metrics in report['sources'].items():
+        for name, values in metrics['stages'].items():
+            lines.append(f'gi_queue_stage_seconds{{source="{source}",stage="{name}"}} {values["seconds"]:.3f}')
+    lines += ['# HELP gi_queue_source_bytes_fetched Bytes downloaded by each source',
+                '# TYPE gi_queue_source_bytes_fetched gauge']
+    lines += [f'gi_queue_source_bytes_fetched{{source="{source}"}} {metrics["bytes_fetched"]}' for source, metrics in report['sources'].items()]
+    lines += ['# HELP gi_queue_source_rows Projects returned by each source',
+                '# TYPE gi_queue_source_rows gauge']
+    lines += [f'gi_queue_source_rows{{source="{source}"}} {metrics["rows"] or 0}' for source, metrics in report['sources'].items()]
+    lines += ['# HELP gi_queue_source_backup_used Whether each source used its backup data',
+                '# TYPE gi_queue_source_backup_used gauge']
+    lines += [f'gi_queue_source_backup_used{{source="{source}"}} {int(metrics["backup_used"])}' for source, metrics in report['sources'].items()]
+    if report['peak_rss_mb'] is not None:
+        lines += ['# HELP gi_queue_peak_rss_megabytes Peak memory use of the last run',
+                    '# TYPE gi_queue_peak_rss_megabytes gauge',
+                    f'gi_queue_peak_rss_megabytes {report["peak_rss_mb"]:.1f}']
+
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(temp_path, path)
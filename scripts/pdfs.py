@@ -0,0 +1,82 @@
+import os
+import glob
+import math
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import tabula
+from pypdf import PdfReader
+
+import metrics
+from config import pdf_workers
+from utils import cachedGet, checkDeadline, withSourceContext
+
+# Parsed tables are saved in the HTTP cache of each source, named after a hash of the PDF they came from
+# so clearCache removes them along with the download they were parsed from
+pdf_cache_dir = 'data/http_cache/{source}/tables'
+
+# tabula starts its JVM the first time it is called, and keeps it running for the rest of the run
+# The first call must not happen from two threads at the same time
+jvm_started = False
+jvm_lock = threading.Lock()
+
+def readPDF(url, source, **tabula_options):
+    # Downloads a PDF and extracts its tables with tabula
+    # Returns the same list of tables as tabula.read_pdf(url, pages='all', **tabula_options),
+    # except that a PDF without any tables gives a single empty table
+    response = cachedGet(url, source)
+    with metrics.stage('parse'):
+        return parseTables(response.content, source, tabula_options)
+
+def parseTables(content, source, tabula_options):
+    # If this exact PDF has already been parsed with the same options, reuse those tables
+    # The hash is taken from the file itself, so a PDF that is posted again under a new link is not parsed again either
+    cache_dir = pdf_cache_dir.format(source = source)
+    pdf_hash = hashlib.sha256(content).hexdigest()
+    options_hash = hashlib.sha256(repr(sorted(tabula_options.items())).encode()).hexdigest()[:16]
+    tables_path = f'{cache_dir}/{pdf_hash}_{options_hash}.pkl'
+    if os.path.exists(tables_path):
+        return pd.read_pickle(tables_path)
+
+    # tabula needs the PDF as a file
+    os.makedirs(cache_dir, exist_ok = True)
+    pdf_path = f'{cache_dir}/{pdf_hash}.pdf'
+    with open(pdf_path, 'wb') as f:
+        f.write(content)
+
+    #### Split the pages across workers ####
+
+    # A PDF without any pages has nothing for tabula to read
+    # The source modules look at the first table, so an empty one is returned instead of an empty list
+    page_count = len(PdfReader(pdf_path).pages)
+    if page_count == 0:
+        os.remove(pdf_path)
+        return [pd.DataFrame()]
+    pages_per_chunk = math.ceil(page_count / pdf_workers)
+    chunks = [list(range(start, min(start + pages_per_chunk, page_count + 1))) for start in range(1, page_count + 1, pages_per_chunk)]
+
+    # A call to tabula cannot be stopped once it has started, so the deadline of the source is checked before each chunk
+    def parsePages(pages):
+        checkDeadline()
+        return tabula.read_pdf(pdf_path, pages = pages, **tabula_options)
+
+    global jvm_started
+    results = []
+    with jvm_lock:
+        if not jvm_started:
+            results.append(parsePages(chunks[0]))
+            chunks = chunks[1:]
+            jvm_started = True
+    with ThreadPoolExecutor(max_workers = pdf_workers) as executor:
+        results.extend(executor.map(withSourceContext(parsePages), chunks))
+
+    # Put the tables back together in page order
+    tables = [table for chunk_tables in results for table in chunk_tables] or [pd.DataFrame()]
+
+    # Tables parsed from older copies of the report are never needed again
+    for old_path in glob.glob(f'{cache_dir}/*.pkl'):
+        os.remove(old_path)
+    pd.to_pickle(tables, tables_path)
+    os.remove(pdf_path)
+    return tables
@@ -0,0 +1,105 @@
+import time
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import metrics
+from config import fetch_workers, fetch_timeouts, default_fetch_timeout
+from utils import readBackup, sendEmail, enforceSchema, splitCounties, clearCache, setSourceDeadline, clearSourceDeadline, SourceTimeout, backup_lock
+from sources import buildQueue
+from browser import getBrowserPool
+
+def fetchQueues(sources, max_workers = fetch_workers):
+
+    # Sources is a list of source descriptions (see sources.py), each named after the backup file for that source
+    # Threads are used instead of processes because the sources are waiting on I/O almost the entire time,
+    # and buildQueue already handles the errors of each source by returning backup data
+    executor = ThreadPoolExecutor(max_workers = max_workers, thread_name_prefix = 'fetch')
+
+    # Track when each source actually starts running
+    # If there are more sources than workers, a source waiting for a free worker should not lose any of its time
+    start_times = {}
+    lock = threading.Lock()
+    # A thread cannot be stopped from outside, so each source gets a deadline and a cancel event instead
+    # Downloads, backups and settings changes check them (see checkDeadline in utils.py) and raise SourceTimeout once the time is up
+    cancel_events = {source['name']: threading.Event() for source in sources}
+
+    def runSource(source):
+        name = source['name']
+        started = time.monotonic()
+        with lock:
+            start_times[name] = started
+        setSourceDeadline(started + fetch_timeouts.get(name, default_fetch_timeout), cancel_events[name])
+        try:
+            # Every queue is checked against the schema in config.py before it is used
+            # If the new data does not fit, the source falls back to its backup below
+            # Projects in more than one county are split across those counties first
+            with metrics.trackSource(name):
+                queue = enforceSchema(splitCounties(buildQueue(source)))
+                metrics.recordRows(len(queue))
+            return queue
+        finally:
+            clearSourceDeadline()
+
+    def useBackup(name, subject, message):
+        # The cancel event is set while holding the backup lock,
+        # so a source that is still running can no longer replace the backup once it has been read
+        # Its cached downloads are cleared too, otherwise the next run would get a 304 for data that never made it into the backup
+        # (a source that is still running clears them again when it stops, see buildQueue in sources.py)
+        with backup_lock:
+            cancel_events[name].set()
+            clearCache(name)
+            backup = enforceSchema(splitCounties(readBackup(name)))
+        sendEmail(subject, message)
+        metrics.recordError(message, source = name)
+        metrics.recordBackup(source = name)
+        metrics.recordRows(len(backup), source = name)
+        return backup
+
+    # Chrome takes a few seconds to start, so a browser is started for each scraped source as soon as it is queued,
+    # while the source is still waiting for a worker or checking for new data
+    browser_sources = [source for source in sources if source.get('browser')]
+    if browser_sources:
+        getBrowserPool().warm(len(browser_sources))
+
+    futures = {executor.submit(runSource, source): source['name'] for source in sources}
+    queues = {}
+
+    #### Collect results as they finish ####
+
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, timeout = 1, return_when = FIRST_COMPLETED)
+
+        for future in done:
+            name = futures[future]
+            timeout = fetch_timeouts.get(name, default_fetch_timeout)
+            try:
+                queues[name] = future.result()
+            except SourceTimeout:
+                # The source noticed it was out of time before the scheduler did
+                queues[name] = useBackup(name, f'Attention needed for {name}', f'{name} did not finish within {timeout} seconds, backup data was used instead')
+            except Exception as e:
+                # buildQueue catches the errors of each source, so this only happens if the data did not fit the schema
+                # or if the fallback itself failed
+                queues[name] = useBackup(name, f'Error raised while fetching {name}', traceback.format_exc())
+
+        # Check if any of the running sources have gone past their time limit
+        now = time.monotonic()
+        for future in list(pending):
+            name = futures[future]
+            timeout = fetch_timeouts.get(name, default_fetch_timeout)
+            with lock:
+                started = start_times.get(name)
+            if (started is not None) and (now - started > timeout):
+                # The source is told to stop, and its result will be ignored
+                pending.remove(future)
+                queues[name] = useBackup(name, f'Attention needed for {name}', f'{name} did not finish within {timeout} seconds, backup data was used instead')
+
+    # A source that timed out stops at its next download or backup, but a call that cannot be interrupted
+    # (one tabula call, one page load, one read from a server) still runs to the end
+    # Python waits for those threads before it exits, so a run can last a little past the longest time limit
+    executor.shutdown(wait = False, cancel_futures = True)
+
+    # Return the queues in the same order they were given
+    return [queues[source['name']] for source in sources]
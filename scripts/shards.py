@@ -0,0 +1,69 @@
+import os
+import json
+import shutil
+
+# The project list for the web page, split into one file per state
+# Each file maps every join_key in that state to its projects, so a county can be looked up directly
+shard_dir = 'data/projects'
+
+# Fields shown in the project table of each county pop-up, in the order they are stored
+shard_fields = ['id',
+                'name',
+                'capacity',
+                'fuel',
+                'submitted_date',
+                'service_date',
+                'transmission_owner',
+                'iso_utility']
+
+def writeProjectShards(projects, rewrite_states = None):
+    # Projects should already be sorted, have dates written as text and capacity rounded
+    # rewrite_states limits the rewrite to those states (lower case, like the end of a join_key), None rewrites every shard
+    # The state is the last part of the join_key (see createJoinKey in utils.py)
+    # The county layer uses two letter state abbreviations, so projects without a join_key, or with any other kind of state
+    # (like N/A, or a full name such as Michigan in some MISO rows), never match a county on the map and are left out
+    join_keys = projects['join_key'].astype('string')
+    states = join_keys.str.rsplit('_', n = 1).str[-1]
+    on_map = states.str.fullmatch('[a-z]{2}', na = False).astype(bool)
+    manifest_path = f'{shard_dir}/manifest.json'
+    rewrite_all = (rewrite_states is None) or (not os.path.exists(manifest_path))
+    if not rewrite_all:
+        on_map &= states.isin(rewrite_states)
+    projects, join_keys, states = projects[on_map], join_keys[on_map], states[on_map]
+
+    # Each project is stored as a list of values in the order of shard_fields, rather than as a record,
+    # so the field names are only written once per file
+    rows = projects[shard_fields].astype(object)
+    rows = rows.where(rows.notna(), None)
+
+    # Shards are rewritten from scratch, so a state that no longer has any projects does not keep an old file
+    # When only some states are rewritten, their old files are removed and the other states are left as they are
+    if rewrite_all:
+        shutil.rmtree(shard_dir, ignore_errors = True)
+        os.makedirs(shard_dir, exist_ok = True)
+        manifest = {'fields': shard_fields, 'shards': {}}
+    else:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        for state in rewrite_states:
+            manifest['shards'].pop(state, None)
+            if os.path.exists(f'{shard_dir}/{state}.json'):
+                os.remove(f'{shard_dir}/{state}.json')
+    for state, state_rows in rows.groupby(states.values, sort = True):
+        counties = {}
+        for join_key, county_rows in state_rows.groupby(join_keys[state_rows.index].values, sort = False):
+            counties[join_key] = county_rows.values.tolist()
+        path = f'{shard_dir}/{state}.json'
+        # Written without any whitespace
+        with open(path, 'w') as f:
+            json.dump({'fields': shard_fields, 'counties': counties}, f, separators = (',', ':'))
+        # A project split across several counties has a row in each of them, so projects are counted by id
+        manifest['shards'][state] = {'counties': len(counties),
+                                    'projects': int(state_rows['id'].nunique()),
+                                    'bytes': os.path.getsize(path)}
+
+    manifest['shards'] = dict(sorted(manifest['shards'].items()))
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, separators = (',', ':'))
+    print(f'Wrote {len(projects)} projects to {len(states.unique())} state files, {sum(shard["bytes"] for shard in manifest["shards"].values()) / 1e3:.0f} kB in total')
+    return manifest
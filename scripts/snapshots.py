@@ -0,0 +1,129 @@
+import os
+import argparse
+from datetime import datetime, timezone
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+# History of every queue, kept as parquet files partitioned by source and run
+# data/snapshots/projects/source=miso/run=2026-10-18T153012Z/part-0.parquet holds the MISO queue as it was in that run
+# data/snapshots/changes/source=miso/run=2026-10-18T153012Z/part-0.parquet holds what changed in it since the snapshot before
+# Runs are named after the time they started (UTC), so runs on the same day each keep their own files
+# Files are only ever added
+snapshot_dir = 'data/snapshots'
+partitioning = ds.partitioning(pa.schema([('source', pa.string()), ('run', pa.string())]), flavor = 'hive')
+run_format = '%Y-%m-%dT%H%M%SZ'
+
+# A project is identified by its queue number within an ISO/utility
+project_key = ['id', 'iso_utility']
+# Capacity changes smaller than this (in MW) are rounding, not real changes
+capacity_tolerance = 0.001
+
+def partitionPath(table, source, run):
+    return f'{snapshot_dir}/{table}/source={source}/run={run}/part-0.parquet'
+
+def snapshotRuns(source):
+    # Runs with a snapshot of a source, oldest first
+    source_dir = f'{snapshot_dir}/projects/source={source}'
+    if not os.path.exists(source_dir):
+        return []
+    return sorted(name.split('=', 1)[1] for name in os.listdir(source_dir) if name.startswith('run='))
+
+def readSnapshot(source, run):
+    return pd.read_parquet(partitionPath('projects', source, run))
+
+def projectTotals(projects):
+    # Projects split across several counties (see splitCounties) are put back together, so each project is one row
+    projects = projects.assign(capacity = projects['capacity'].astype('float64'),
+                                id = projects['id'].astype(str),
+                                iso_utility = projects['iso_utility'].astype(str))
+    return projects.groupby(project_key, sort = False).agg(name = ('name', 'first'),
+                                                            fuel = ('fuel', 'first'),
+                                                            state = ('state', 'first'),
+                                                            capacity = ('capacity', 'sum'),
+                                                            service_date = ('service_date', 'first')).reset_index()
+
+def diffSnapshots(previous, current):
+    # Compares two snapshots of a queue with a single hash join on the project key
+    # Returns one row per change: added, withdrawn, capacity_changed or date_slipped
+    # A project can have both a capacity change and a date slip
+    merged = projectTotals(previous).merge(projectTotals(current), on = project_key, how = 'outer',
+                                            suffixes = ('_before', '_after'), indicator = True)
+    both = merged['_merge'] == 'both'
+    capacity_changed = both & ((merged['capacity_after'] - merged['capacity_before']).abs() > capacity_tolerance)
+    date_slipped = both & (merged['service_date_after'] > merged['service_date_before'])
+
+    changes = []
+    for change, rows in [('added', merged['_merge'] == 'right_only'),
+                        ('withdrawn', merged['_merge'] == 'left_only'),
+                        ('capacity_changed', capacity_changed),
+                        ('date_slipped', date_slipped)]:
+        changes.append(merged[rows].assign(change = change))
+    changes = pd.concat(changes, ignore_index = True)
+
+    # Describe each project with its latest details
+    for column in ['name', 'fuel', 'state']:
+        changes[column] = changes[f'{column}_after'].fillna(changes[f'{column}_before'])
+    return changes[['change'] + project_key + ['name', 'fuel', 'state',
+                    'capacity_before', 'capacity_after', 'service_date_before', 'service_date_after']]
+
+def recordSnapshots(queues, changed, run = None):
+    # Saves a snapshot of every source that changed, and what changed since its last snapshot
+    # The first snapshot of a source is only a starting point, so it has no changes
+    # Returns the changes of this run
+    run = run or datetime.now(timezone.utc).strftime(run_format)
+    all_changes = []
+    for source in changed:
+        current = queues[source]
+        previous_runs = [previous_run for previous_run in snapshotRuns(source) if previous_run < run]
+
+        path = partitionPath('projects', source, run)
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        current.to_parquet(path, index = False)
+
+        if not previous_runs:
+            continue
+        changes = diffSnapshots(readSnapshot(source, previous_runs[-1]), current)
+        path = partitionPath('changes', source, run)
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        changes.to_parquet(path, index = False)
+        all_changes.append(changes.assign(source = source, run = run))
+
+    if not all_changes:
+        return None
+    return pd.concat(all_changes, ignore_index = True)
+
+def summarizeChanges(changes):
+    # One line per source, for the email sent after each run
+    if (changes is None) or (len(changes) == 0):
+        return 'No projects changed'
+    counts = changes.groupby(['source', 'change']).size().unstack(fill_value = 0)
+    return '\n'.join(f'{source}: ' + ', '.join(f'{count} {change}' for change, count in row.items() if count > 0)
+                    for source, row in counts.iterrows())
+
+def changesSince(since, sources = None):
+    # Every change recorded on or after since (YYYY-MM-DD)
+    # Run names start with their date, so they sort after since from the first run of that day
+    # Only the change files of the matching runs and sources are read, never the full snapshots
+    changes_dir = f'{snapshot_dir}/changes'
+    if not os.path.exists(changes_dir):
+        return pd.DataFrame()
+    dataset = ds.dataset(changes_dir, format = 'parquet', partitioning = partitioning)
+    condition = ds.field('run') >= since
+    if sources:
+        condition = condition & ds.field('source').isin(sources)
+    return dataset.to_table(filter = condition).to_pandas().sort_values(['run', 'source', 'change'])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = 'List the queue changes recorded since a date')
+    parser.add_argument('since', help = 'first date to include, as YYYY-MM-DD')
+    parser.add_argument('--source', action = 'append', help = 'only include this source (can be repeated)')
+    args = parser.parse_args()
+
+    changes = changesSince(args.since, args.source)
+    if len(changes) == 0:
+        print(f'No changes recorded since {args.since}')
+    else:
+        print(summarizeChanges(changes))
+        with pd.option_context('display.max_rows', None, 'display.width', 200):
+            print(changes.to_string(index = False))
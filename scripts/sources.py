@@ -0,0 +1,84 @@
+import importlib
+import traceback
+
+import metrics
+from config import source_modules
+from utils import standardizeFields, standardizeFuels, createJoinKey, sendEmail, clearCache, readBackup, writeBackup, SourceTimeout
+
+# Every queue is described by a dictionary named `source` in its own module in scripts/
+# The modules that are used are listed in source_modules in config.py
+#
+# name:         name of the backup file in data/individual_queues, also used for the HTTP cache,
+#               the fuel types in fuel_maps and the time limit in fetch_timeouts (all in config.py)
+# iso_utility:  what the projects are labelled as on the map, or None to use the transmission owner of each project
+# fetch:        downloads the data and returns it, or returns None if nothing new has been published
+#               (the backup is already up to date in that case)
+# parse:        turns whatever fetch returned into a DataFrame with one row for each active generation project
+# fields:       the 9 columns of that DataFrame that hold each of the standard fields, in the same order as
+#               standard_fields in config.py
+# finish:       (optional) any last changes, once the fields and fuel types have been standardized
+# save_backup:  (optional) set to False so a new copy of the data never replaces the backup
+# browser:      (optional) set to True if fetch borrows a browser from the shared pool in browser.py,
+#               so the scheduler can start one as soon as the source is queued
+#
+# Sources whose data only ever comes from the backup can leave out parse and fields, as long as fetch always returns None
+
+def loadSources(modules = source_modules):
+    # Imports each source module and returns its description
+    return [importlib.import_module(module).source for module in modules]
+
+def buildQueue(source):
+    # Runs the steps every source has in common, and returns the standardized queue
+    # If anything goes wrong, the backup data is returned instead
+    name = source['name']
+    try:
+        raw_data = source['fetch']()
+        if raw_data is None:
+            return readBackup(name)
+        projects = source['parse'](raw_data)
+
+        #### Standardize Columns ####
+
+        # This function filters down the dataset to the 9 specific fields
+        # Then, it renames the columns to standardized ones defined in config.py
+        projects = standardizeFields(projects, source['fields'])
+
+        #### Standardize Fuel Types ####
+
+        # This function standardizes the fuel types using the rules for this source in config.py
+        # This is necessary so we can aggregate all of the dataframe from every ISO/utility
+        projects = standardizeFuels(projects, name)
+
+        #### Final Steps ####
+
+        # Create new column to highlight which RTO/utility this data came from
+        if source['iso_utility'] is None:
+            projects['iso_utility'] = projects['transmission_owner']
+        else:
+            projects['iso_utility'] = source['iso_utility']
+        if 'finish' in source:
+            projects = source['finish'](projects)
+        # Create a common key from county name and state abbr
+        # This will allow the data to be joined to spatial layer later
+        projects = createJoinKey(projects)
+        # Export to the backup store
+        # This will act as a "backup" in case the next run fails
+        if source.get('save_backup', True):
+            writeBackup(projects, name)
+        return projects
+
+    # A source that ran out of time is handled by the scheduler, which has already used the backup
+    # It may have saved the validators of a download it never finished with, so the next run has to download it again
+    except SourceTimeout:
+        clearCache(name)
+        raise
+    # If the above code throws an error, fetch the backup data and return that instead
+    except Exception as e:
+        error = traceback.format_exc()
+        print(error)
+        # Send email notification
+        sendEmail(f'Error raised in {name}', error)
+        metrics.recordError(error, source = name)
+        # Make sure the next run downloads the data again instead of reusing it
+        clearCache(name)
+        return readBackup(name)
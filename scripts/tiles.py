@@ -0,0 +1,107 @@
+import math
+import gzip
+import numpy as np
+import shapely
+import mapbox_vector_tile
+from pmtiles.tile import zxy_to_tileid, TileType, Compression
+from pmtiles.writer import write
+
+from geometry import simplifyCoverage
+from config import tile_min_zoom, tile_max_zoom, tile_tolerance_px, tile_buffer_px
+
+# The county choropleth as Mapbox vector tiles, stored in a single PMTiles archive
+# The page reads only the tiles it is showing from this file, using HTTP range requests
+county_tiles = 'data/agg_county_data.pmtiles'
+# Name of the layer inside each tile, script.js styles this layer
+tile_layer = 'counties'
+
+# Web Mercator covers a square this many meters wide, zoom 0 is one tile of that size
+world_size = 2 * math.pi * 6378137
+tile_pixels = 256
+tile_extent = 4096
+
+def tileBounds(zoom, x, y):
+    # Web Mercator bounds of a tile, in the XYZ numbering used by Leaflet
+    tile_size = world_size / 2 ** zoom
+    min_x = -world_size / 2 + x * tile_size
+    max_y = world_size / 2 - y * tile_size
+    return min_x, max_y - tile_size, min_x + tile_size, max_y
+
+def tileProperties(counties):
+    # MVT cannot store empty values, so a county without any projects gets 0 for every total
+    # That way the page can treat a missing total and a total of zero the same way
+    attributes = counties.drop(columns = counties.geometry.name)
+    numeric = attributes.select_dtypes('number').columns
+    attributes[numeric] = attributes[numeric].fillna(0)
+    records = attributes.astype(object).where(attributes.notna(), None).to_dict('records')
+    return [{key: value for key, value in record.items() if value is not None} for record in records]
+
+def buildTiles(counties):
+    # Returns every tile as {tile id: gzipped MVT}, built with a different level of simplification for each zoom level
+    counties = counties.to_crs(3857)
+    properties = tileProperties(counties)
+    tiles = {}
+
+    for zoom in range(tile_min_zoom, tile_max_zoom + 1):
+        tile_count = 2 ** zoom
+        tile_size = world_size / tile_count
+        pixel_size = tile_size / tile_pixels
+
+        # Detail that would be smaller than a pixel at this zoom level is removed
+        geometries = simplifyCoverage(counties.geometry.to_numpy(), pixel_size * tile_tolerance_px)
+        tree = shapely.STRtree(geometries)
+
+        # Find every tile that at least one county touches
+        bounds = shapely.bounds(geometries)
+        valid = ~np.isnan(bounds).any(axis = 1)
+        first_x = np.clip(np.floor((bounds[valid, 0] + world_size / 2) / tile_size), 0, tile_count - 1).astype(int)
+        last_x = np.clip(np.floor((bounds[valid, 2] + world_size / 2) / tile_size), 0, tile_count - 1).astype(int)
+        first_y = np.clip(np.floor((world_size / 2 - bounds[valid, 3]) / tile_size), 0, tile_count - 1).astype(int)
+        last_y = np.clip(np.floor((world_size / 2 - bounds[valid, 1]) / tile_size), 0, tile_count - 1).astype(int)
+        tile_coords = {(x, y) for x0, x1, y0, y1 in zip(first_x, last_x, first_y, last_y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)}
+
+        for x, y in tile_coords:
+            min_x, min_y, max_x, max_y = tileBounds(zoom, x, y)
+            buffer = pixel_size * tile_buffer_px
+            clip_bounds = (min_x - buffer, min_y - buffer, max_x + buffer, max_y + buffer)
+            # Counties keep the order they were given in, so the ones drawn last stay on top
+            matches = np.sort(tree.query(shapely.box(*clip_bounds), predicate = 'intersects'))
+            if len(matches) == 0:
+                continue
+            clipped = shapely.clip_by_rect(geometries[matches], *clip_bounds)
+            features = [{'geometry': geometry, 'properties': properties[i]} for geometry, i in zip(clipped, matches) if not geometry.is_empty]
+            if not features:
+                continue
+            tile = mapbox_vector_tile.encode({'name': tile_layer, 'features': features},
+                                            default_options = {'quantize_bounds': (min_x, min_y, max_x, max_y), 'extents': tile_extent})
+            tiles[zxy_to_tileid(zoom, x, y)] = gzip.compress(tile, mtime = 0)
+        print(f'Built {len(tile_coords)} tiles for zoom {zoom}')
+    return tiles
+
+def writeCountyTiles(counties):
+    # Counties is the spatialized county data, with the same attributes as agg_county_data.geojson
+    tiles = buildTiles(counties)
+
+    min_lon, min_lat, max_lon, max_lat = counties.to_crs(4326).total_bounds
+    header = {'tile_type': TileType.MVT,
+                'tile_compression': Compression.GZIP,
+                'min_zoom': tile_min_zoom,
+                'max_zoom': tile_max_zoom,
+                'min_lon_e7': int(min_lon * 1e7),
+                'min_lat_e7': int(min_lat * 1e7),
+                'max_lon_e7': int(max_lon * 1e7),
+                'max_lat_e7': int(max_lat * 1e7),
+                'center_zoom': tile_min_zoom,
+                'center_lon_e7': int((min_lon + max_lon) / 2 * 1e7),
+                'center_lat_e7': int((min_lat + max_lat) / 2 * 1e7)}
+    # Describes the layer to other tools that read the archive
+    fields = {column: ('Number' if column in counties.select_dtypes('number').columns else 'String') for column in counties.columns if column != counties.geometry.name}
+    metadata = {'vector_layers': [{'id': tile_layer, 'fields': fields, 'minzoom': tile_min_zoom, 'maxzoom': tile_max_zoom}]}
+
+    # Tiles are written in order of their id, which lets readers find them with fewer requests
+    with write(county_tiles) as writer:
+        for tile_id in sorted(tiles):
+            writer.write_tile(tile_id, tiles[tile_id])
+        writer.finalize(header, metadata)
+    print(f'Wrote {len(tiles)} vector tiles to {county_tiles}')
+    return len(tiles)
@@ -1,29 +1,21 @@
-import traceback
-import pandas as pd
-import tabula
+from utils import sendEmail, isURLValid
 
-from utils import standardizeFuels, standardizeFields, createJoinKey, sendEmail
+def fetchTVA():
+    #### Check if data needs to be updated ####
 
-def getTVAQueue():
+    # Because TVA publishes a new report every few months, this script checks to see
+    # if a new link has been found
+    url_check = 'http://www.oasis.oati.com/woa/docs/TVA/TVAdocs/QueueTransition_-_Election_-_final.pdf'
 
-        # Check for errors during code execution
-        # If anything changes with the access link, or some other scenario,
-        # The script will instead use backup data to send to main.py
-    try:
-        #### Check if data needs to be updated ####
+    # The data itself comes from the backup, so only check that the link still works
+    # This asks the server for the headers of the file instead of downloading and parsing the whole PDF
+    if not isURLValid(url_check):
+        sendEmail('Attention needed for TVA', f'The TVA queue is no longer available at {url_check}')
+    # The backup is always used
+    return None
 
-        # Because TVA publishes a new report every few months, this script checks to see
-        # if a new link has been found
-        url_check = 'http://www.oasis.oati.com/woa/docs/TVA/TVAdocs/QueueTransition_-_Election_-_final.pdf'
-
-        tabula.read_pdf(url_check, pages = 'all', pandas_options={'header': 1})
-
-    except Exception as e:
-        error = traceback.format_exc()
-        # Send email notification
-        sendEmail('Error raised in tva.py', error)
-
-    tva_backup = pd.read_csv('data/individual_queues/tva_active_projects.csv')
-    return tva_backup
-    
-#getTVAQueue().to_csv(f"C:/Users/zleig/Downloads/tempTVA2.csv", index=None)
+# The rest of the steps are the same for every source (see sources.py)
+# Nothing is ever downloaded, so there is nothing to parse
+source = {'name': 'tva',
+        'iso_utility': 'TVA',
+        'fetch': fetchTVA}
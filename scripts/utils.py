@@ -1,11 +1,83 @@
 import os
+import re
+import json
+import shutil
+import time
+import hashlib
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import smtplib
 from email.mime.text import MIMEText
 
-from config import standard_fuels, standard_fields
+import metrics
+from config import standard_fuels, standard_fields, fuel_maps, project_schema, backup_csv_mirror, http_timeout, http_retries, http_backoff, http_pool_size, url_probe_workers, url_recheck_days, county_separators, separator_county_names
+
+# One session is shared by every source so connections to the same host get reused
+session = None
+session_lock = threading.Lock()
+# Protects scripts/script_data/download_settings.csv from being written by two sources at once
+download_settings_lock = threading.Lock()
+# Held while a backup is written, so a source that runs out of time cannot replace its backup
+# after the scheduler has already read it (see fetchQueues in scheduler.py)
+backup_lock = threading.Lock()
+
+#### Source deadlines ####
+
+# Each source has until its deadline to finish, after which every download, backup and settings change raises SourceTimeout
+# The scheduler can also cancel a source early by setting its cancel event
+source_context = threading.local()
+
+class SourceTimeout(Exception):
+    pass
+
+def setSourceDeadline(deadline, cancel):
+    # deadline is a time.monotonic() value, cancel is a threading.Event
+    source_context.deadline = deadline
+    source_context.cancel = cancel
+
+def clearSourceDeadline():
+    source_context.deadline = None
+    source_context.cancel = None
+
+def remainingTime():
+    # Seconds left before the deadline of the source this thread is working for, or None without a deadline
+    deadline = getattr(source_context, 'deadline', None)
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+def checkDeadline():
+    # Called before anything that takes a while or changes saved data
+    cancel = getattr(source_context, 'cancel', None)
+    remaining = remainingTime()
+    if ((cancel is not None) and cancel.is_set()) or ((remaining is not None) and (remaining <= 0)):
+        raise SourceTimeout('The source ran out of time')
+
+def withSourceContext(function):
+    # Threads started by a source (like the link probes in findNewURL) do not share its thread-local settings,
+    # so the function is wrapped to run with the same deadline as the thread that wrapped it,
+    # and with its metrics counted towards the same source and stage
+    deadline = getattr(source_context, 'deadline', None)
+    cancel = getattr(source_context, 'cancel', None)
+    source = getattr(metrics.current, 'source', None)
+    stage = getattr(metrics.current, 'stage', None)
+    def run(*args, **kwargs):
+        setSourceDeadline(deadline, cancel)
+        metrics.current.source, metrics.current.stage = source, stage
+        try:
+            return function(*args, **kwargs)
+        finally:
+            clearSourceDeadline()
+            metrics.current.source, metrics.current.stage = None, None
+    return run
 
 def sendEmail(subject, message):
     SMTP_SERVER = "smtp.gmail.com"
@@ -29,9 +101,81 @@ def sendEmail(subject, message):
         print(f"Failed to send email: {e}")
 
 def createJoinKey(df):
-    df['join_key'] = (df['county'].str.replace(r'[ .-]', '', regex=True) + '_' + df['state']).str.lower()
+    with metrics.stage('standardize'):
+        df['join_key'] = (df['county'].str.replace(r'[ .-]', '', regex=True) + '_' + df['state']).str.lower()
     return df
 
+def splitCounties(projects):
+    # Projects that list more than one county get one row per county, with the capacity split evenly between them
+    # Every source goes through this after it is fetched, so the county totals include every county a project is in
+    # Split rows keep the id of their project, so projects have to be counted by unique id rather than by row
+    # Queues often come in with a filtered or non-unique index, so every row gets a fresh position first
+    projects = projects.reset_index(drop = True)
+    counties = projects['county'].astype('string')
+    # Protect county names that contain a separator by swapping their spaces out until the split is done
+    protected_names = '|'.join(re.escape(name) for name in separator_county_names)
+    counties = counties.str.replace(protected_names, lambda match: match.group(0).replace(' ', '_'), regex = True)
+    multiple = counties.str.contains(county_separators, regex = True).fillna(False)
+    if not multiple.any():
+        return projects
+
+    split_projects = projects.assign(county = counties.str.split(county_separators, regex = True)).explode('county')
+    split_projects['county'] = split_projects['county'].str.replace('_', ' ').str.replace(r' (County|Parish)$', '', regex = True)
+    # Trailing separators leave empty names behind
+    split_projects = split_projects[split_projects['county'].isna() | (split_projects['county'] != '')]
+
+    # The index still points to the original project, so it is used to count how many counties each one was split into
+    county_count = split_projects.groupby(level = 0)['county'].transform('size')
+    split_projects['capacity'] = pd.to_numeric(split_projects['capacity'], errors = 'coerce') / county_count
+    print(f'Split {multiple.sum()} projects that are in more than one county')
+    return createJoinKey(split_projects.reset_index(drop = True))
+
+def readBackup(source, columns = None):
+    # Every source saves its last successful run to data/individual_queues
+    # This is used whenever a fresh copy of the data cannot be retrieved
+    # Columns can be used to read only part of the backup
+    if columns is None:
+        metrics.recordBackup()
+    parquet_path = f'data/individual_queues/{source}_active_projects.parquet'
+    csv_path = f'data/individual_queues/{source}_active_projects.csv'
+    # The CSV is the copy that gets edited by hand (like the offshore wind counties that isone.py carries over),
+    # so the parquet file is only used while the CSV is still exactly what was written next to it
+    # A parquet file written without the CSV copy (backup_csv_mirror = False) has no hash, and is always newer than any CSV
+    if os.path.exists(parquet_path):
+        csv_hash = backupCSVHash(parquet_path)
+        if (csv_hash is None) or (not os.path.exists(csv_path)) or (fileHash(csv_path) == csv_hash):
+            return pd.read_parquet(parquet_path, columns = columns)
+        print(f'{csv_path} has been edited since it was written, reading it instead of the parquet backup')
+    # Queue numbers are read as text so values like NYISO's 0276 keep their leading zeros
+    return pd.read_csv(csv_path, dtype={'id': str}, usecols = columns)
+
+def fileHash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def backupCSVHash(parquet_path):
+    # Hash of the CSV that was written along with a parquet backup, kept in the parquet file's metadata
+    # None if the backup was written without a CSV copy
+    metadata = pq.read_schema(parquet_path).metadata or {}
+    if b'csv_sha256' not in metadata:
+        return None
+    return metadata[b'csv_sha256'].decode()
+
+def writeBackup(projects, source):
+    # The backup is stored as parquet so it reads back with the same types it was written with
+    projects = enforceSchema(projects)
+    # A source that has run out of time must not replace the backup the scheduler used instead
+    with backup_lock:
+        checkDeadline()
+        table = pa.Table.from_pandas(projects, preserve_index = False)
+        # A CSV copy makes changes to each queue easy to follow in the repo history, and is where hand edits are made
+        # Its hash is saved with the parquet file, so readBackup can tell when the CSV has been edited since
+        if backup_csv_mirror:
+            csv_path = f'data/individual_queues/{source}_active_projects.csv'
+            projects.to_csv(csv_path, index = False)
+            table = table.replace_schema_metadata({**table.schema.metadata, b'csv_sha256': fileHash(csv_path).encode()})
+        pq.write_table(table, f'data/individual_queues/{source}_active_projects.parquet')
+
 def standardizeFields(df, input_fields):
     # Create a mapping from standard_columns to input_columns using zip
     column_mapping = dict(zip(standard_fields, input_fields))
@@ -55,16 +199,188 @@ def standardizeFields(df, input_fields):
     # Return the standardized DataFrame
     return df_subset
 
-def standardizeFuels(projects, fuel_indices):
-    fuel_index_dict = zip(standard_fuels, fuel_indices)
-    for fuel, indices in fuel_index_dict:
-        projects.loc[indices, 'fuel'] = fuel
+def standardizeFuels(projects, source):
+    # Replaces the fuel types used by a source with the standard fuel types
+    # This is necessary so we can aggregate all of the dataframe from every ISO/utility
+    with metrics.stage('standardize'):
+        projects['fuel'] = classifyFuels(projects['fuel'], fuel_maps[source])
     return projects
 
+def classifyFuels(fuels, fuel_map):
+    # Each distinct fuel value only gets classified once
+    # factorize gives every project the position of its fuel in the list of distinct values,
+    # which is then used to look up the standard fuel for all projects in one step
+    positions, distinct_fuels = pd.factorize(fuels)
+
+    standard_codes = []
+    for value in distinct_fuels:
+        fuel = fuel_map.get('codes', {}).get(value)
+        if fuel is None:
+            for pattern, pattern_fuel in fuel_map.get('patterns', []):
+                if re.search(pattern, str(value)):
+                    fuel = pattern_fuel
+                    break
+        if fuel is None:
+            fuel = 'Other'
+        standard_codes.append(standard_fuels.index(fuel))
+
+    # Missing fuel values have a position of -1, which picks up the 'Other' code added at the end
+    standard_codes.append(standard_fuels.index('Other'))
+    standard_codes = np.array(standard_codes)
+    return pd.Categorical.from_codes(standard_codes[positions], categories=standard_fuels)
+
+def enforceSchema(projects):
+    # Makes sure a queue has every column in config.project_schema, converted to the right type
+    # Any other columns are dropped
+    missing_columns = [column for column in project_schema if column not in projects.columns]
+    if missing_columns:
+        raise ValueError(f'Queue is missing columns: {", ".join(missing_columns)}')
+    unknown_fuels = set(projects['fuel'].dropna().astype(str)) - set(standard_fuels)
+    if unknown_fuels:
+        raise ValueError(f'Queue has fuel types that were not standardized: {", ".join(sorted(unknown_fuels))}')
+
+    projects = projects[list(project_schema)].reset_index(drop=True)
+    typed_projects = {}
+    for column, dtype in project_schema.items():
+        if column == 'fuel':
+            # Always use the full list of standard fuels so every queue has the same categories
+            typed_projects[column] = pd.Categorical(projects[column], categories=standard_fuels)
+        elif dtype == 'float32':
+            typed_projects[column] = pd.to_numeric(projects[column], errors='coerce').astype('float32')
+        elif dtype.startswith('datetime'):
+            typed_projects[column] = parseDates(projects[column])
+        else:
+            typed_projects[column] = projects[column].astype(dtype)
+    return pd.DataFrame(typed_projects)
+
+def parseDates(dates):
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return dates
+    # Some sources only list the month and year (e.g. 04-2026 or 11/2027)
+    # Those get set to the first day of the month instead of being filled in with today's day
+    dates = dates.astype('string').str.strip().str.replace(r'^(\d{1,2})[-/](\d{4})$', r'\2-\1-01', regex=True)
+    return pd.to_datetime(dates, errors='coerce', format='mixed')
+
+def getSession():
+    global session
+    with session_lock:
+        if session is None:
+            # Retry connection errors and server errors with an exponential backoff
+            # so that a short outage does not send a source straight to its backup data
+            retries = Retry(total = http_retries,
+                            backoff_factor = http_backoff,
+                            status_forcelist = [429, 500, 502, 503, 504],
+                            allowed_methods = ['HEAD', 'GET'],
+                            raise_on_status = False)
+            adapter = HTTPAdapter(pool_connections = http_pool_size, pool_maxsize = http_pool_size, max_retries = retries)
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+    return session
+
+def httpRequest(method, url, **kwargs):
+    # Every request has a timeout, so one slow server cannot hang the whole run
+    # Inside a source, the timeout is also cut down to the time the source has left
+    checkDeadline()
+    kwargs.setdefault('timeout', http_timeout)
+    remaining = remainingTime()
+    if remaining is not None:
+        timeout = kwargs['timeout']
+        connect_timeout, read_timeout = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        kwargs['timeout'] = (min(connect_timeout, remaining), min(read_timeout, remaining))
+    start = time.perf_counter()
+    try:
+        with metrics.stage('download'):
+            response = getSession().request(method, url, **kwargs)
+    except Exception as e:
+        print(f'{method} {url} failed after {time.perf_counter() - start:.2f}s: {e}')
+        raise
+    # Streamed downloads are counted as they are read
+    if not kwargs.get('stream'):
+        metrics.addBytes(len(response.content))
+    # Print the time each request took so slow servers show up in the logs
+    print(f'{method} {url} {response.status_code} in {time.perf_counter() - start:.2f}s')
+    return response
+
+def httpGet(url, **kwargs):
+    return httpRequest('GET', url, **kwargs)
+
+def cachedGet(url, source, key = None, stream = False):
+    # Downloads a file, but asks the server to skip sending it if it has not changed since the last run
+    # The response gets a from_cache attribute that tells the source module whether it can reuse its backup data
+    # The cache key defaults to the URL, but can be set for links that change every day (ISO-NE)
+    # With stream = True, the file is written straight to disk instead of being held in memory,
+    # and the response gets a body_path attribute pointing to it
+    cache_dir = f'data/http_cache/{source}'
+    cache_name = hashlib.sha1((key or url).encode()).hexdigest()
+    meta_path = f'{cache_dir}/{cache_name}.json'
+    body_path = f'{cache_dir}/{cache_name}.body'
+
+    # Read the validators saved from the last download
+    headers = {}
+    meta = None
+    if os.path.exists(meta_path) and os.path.exists(body_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+    response = httpGet(url, headers = headers, stream = stream)
+
+    # 304 means nothing has changed, so fill in the response with the saved copy of the file
+    if (response.status_code == 304) and (meta is not None):
+        if stream:
+            response.body_path = body_path
+        else:
+            with open(body_path, 'rb') as f:
+                response._content = f.read()
+        response.from_cache = True
+        metrics.recordNotModified()
+        return response
+
+    response.raise_for_status()
+    response.from_cache = False
+
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+    if stream:
+        # Write the file in chunks so that it never has to fit in memory
+        os.makedirs(cache_dir, exist_ok = True)
+        with metrics.stage('download'), open(body_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size = 1024 * 1024):
+                checkDeadline()
+                f.write(chunk)
+                metrics.addBytes(len(chunk))
+        response.body_path = body_path
+    elif etag or last_modified:
+        os.makedirs(cache_dir, exist_ok = True)
+        with open(body_path, 'wb') as f:
+            f.write(response.content)
+
+    # Only save validators when the server sent them, otherwise the server can never answer with a 304
+    if etag or last_modified:
+        with open(meta_path, 'w') as f:
+            json.dump({'url': url, 'etag': etag, 'last_modified': last_modified}, f)
+    elif os.path.exists(meta_path):
+        os.remove(meta_path)
+    return response
+
+def clearCache(source):
+    # Called when a source fails after downloading its data
+    # Otherwise the next run would get a 304 and keep reusing the data from before the failure
+    shutil.rmtree(f'data/http_cache/{source}', ignore_errors = True)
+
 def isURLValid(url):
+    # Only the headers are requested, so checking a link does not download the whole file
     try:
-        request = requests.get(url)
-        if request.status_code == 200:
+        request = httpRequest('HEAD', url, allow_redirects = True)
+        # Some servers do not answer HEAD requests, so ask for the first byte of the file instead
+        if request.status_code in [403, 405, 501]:
+            request = httpGet(url, headers = {'Range': 'bytes=0-0'}, stream = True)
+            request.close()
+        if request.status_code in [200, 206]:
             return True
         else:
             return False
@@ -74,12 +390,14 @@ def isURLValid(url):
 def findNewURL(utility):
     #Access the download settings that track working urls and data updates
     ds_path = f'scripts/script_data/download_settings.csv'
-    download_settings = pd.read_csv(ds_path, index_col='name')
+    with download_settings_lock:
+        download_settings = pd.read_csv(ds_path, index_col='name', dtype=str)
 
     #Read data from download settings
     base_url = download_settings.loc[utility]['base_url']
     last_updated = download_settings.loc[utility]['last_updated']
     date_format = download_settings.loc[utility]['date_format']
+    checked_through = download_settings.loc[utility]['checked_through']
 
     #Convert tracker to datetime object
     date_tracker = datetime.strptime(last_updated, "%m/%d/%Y")
@@ -87,23 +405,47 @@ def findNewURL(utility):
     #If the URL on file is already working, return None to indicate no update is necessary
     if isURLValid(base_url.format(date_tracker.strftime(date_format))):
         return None
-    #If the URL on file does not work anymore, loop through all possible dates to find something new
-    while date_tracker < datetime.now():
-        #Create URL for testing
-        formatted_date = date_tracker.strftime(date_format)
-        full_url = base_url.format(formatted_date)
-
-        #If the URL is valid, that means that the dataset needs to be updated
-        if isURLValid(full_url):
-            correct_date = date_tracker.strftime("%m/%d/%Y")
-            #Update download settings to reflect changes
-            download_settings.loc[utility, 'last_updated'] = correct_date
-            #Save changes
-            download_settings.to_csv(ds_path)
-            #Return the new URL so the module can update the data
-            return full_url
-        else:
-            #If no valid URL found, try the next day
-            date_tracker = date_tracker + timedelta(days=1)
+
+    #If the URL on file does not work anymore, check all of the dates since the last update
+    #Dates that were already checked on a previous run get skipped,
+    #except for the last few days, since a report can be posted a few days after its date
+    first_date = date_tracker + timedelta(days=1)
+    if not pd.isna(checked_through):
+        recheck_date = datetime.strptime(checked_through, "%m/%d/%Y") - timedelta(days=url_recheck_days)
+        first_date = max(first_date, recheck_date)
+    candidate_dates = pd.date_range(first_date, datetime.now(), freq='D').to_pydatetime()
+
+    #Check the dates in batches, with every date in a batch checked at the same time
+    #The batches go in order, so the search stops at the first batch with a working link
+    with ThreadPoolExecutor(max_workers = url_probe_workers) as executor:
+        for i in range(0, len(candidate_dates), url_probe_workers):
+            batch = candidate_dates[i:i + url_probe_workers]
+            urls = [base_url.format(date.strftime(date_format)) for date in batch]
+            results = list(executor.map(withSourceContext(isURLValid), urls))
+            checkDeadline()
+
+            #If one of the URLs is valid, that means that the dataset needs to be updated
+            if True in results:
+                #Use the earliest date in case more than one date works
+                hit = results.index(True)
+                correct_date = batch[hit].strftime("%m/%d/%Y")
+                #Save changes to the download settings
+                saveDownloadSettings(ds_path, utility, last_updated = correct_date, checked_through = correct_date)
+                #Return the new URL so the module can update the data
+                return urls[hit]
+
+    #Remember that all of these dates have been checked, so the next run can start from today
+    saveDownloadSettings(ds_path, utility, checked_through = datetime.now().strftime("%m/%d/%Y"))
     sendEmail("Attention needed for " + utility, "No valid link found")
     return None
+
+def saveDownloadSettings(ds_path, utility, **values):
+    #Sources can run at the same time, so the file is re-read inside the lock
+    #This avoids one source overwriting changes made by another
+    with download_settings_lock:
+        # A source that has run out of time must not change the settings any more
+        checkDeadline()
+        download_settings = pd.read_csv(ds_path, index_col='name', dtype=str)
+        for column, value in values.items():
+            download_settings.loc[utility, column] = value
+        download_settings.to_csv(ds_path)
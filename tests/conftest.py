@@ -0,0 +1,60 @@
+import os
+import sys
+import json
+import pytest
+import requests
+
+# The pipeline modules import each other by name, the same way they do when run from scripts/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+import utils
+
+class FakeServer:
+
+    # Stands in for utils.httpGet, serving one file that answers conditional requests with a 304 like a real server
+    def __init__(self, body):
+        self.body = body
+        self.etag = '"1"'
+        self.requests = []
+
+    def get(self, url, headers = None, stream = False, **kwargs):
+        headers = headers or {}
+        self.requests.append(headers)
+        response = requests.Response()
+        response.url = url
+        if headers.get('If-None-Match') == self.etag:
+            response.status_code = 304
+            response._content = b''
+        else:
+            response.status_code = 200
+            response.headers['ETag'] = self.etag
+            response._content = json.dumps(self.body).encode()
+        # The whole body is already in memory, so iter_content reads it from there when streaming
+        response._content_consumed = True
+        return response
+
+    def publish(self, body):
+        self.body = body
+        self.etag = f'"{int(self.etag.strip(chr(34))) + 1}"'
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # Every path in the pipeline is relative to the root of the repository, so tests run in an empty copy of it
+    os.makedirs(tmp_path / 'data' / 'individual_queues')
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+@pytest.fixture
+def server(monkeypatch):
+    fake_server = FakeServer([])
+    monkeypatch.setattr(utils, 'httpGet', fake_server.get)
+    return fake_server
+
+@pytest.fixture
+def project_rows():
+    # Builds standardized projects with the given ids, all in the same county
+    def rows(ids):
+        return [{'id': id, 'name': f'Project {id}', 'capacity': 10.0, 'fuel': 'Solar', 'submitted_date': '2024-01-01',
+                'service_date': '2026-01-01', 'county': 'Dane', 'state': 'WI', 'transmission_owner': 'ATC',
+                'iso_utility': 'MISO', 'join_key': 'dane_wi'} for id in ids]
+    return rows
@@ -0,0 +1,17 @@
+import pandas as pd
+
+import utils
+
+def test_hand_edited_csv_is_read(workdir, project_rows):
+    utils.writeBackup(pd.DataFrame(project_rows(['1', '2'])), 'tva')
+    backup = pd.read_csv('data/individual_queues/tva_active_projects.csv')
+    backup.loc[0, 'county'] = 'Rock'
+    backup.to_csv('data/individual_queues/tva_active_projects.csv', index = False)
+    assert utils.readBackup('tva')['county'].tolist() == ['Rock', 'Dane']
+
+def test_backup_without_csv_mirror_ignores_old_csv(workdir, project_rows, monkeypatch):
+    # A CSV committed before the mirror was turned off is older than every parquet backup written since
+    pd.DataFrame(project_rows(['old1', 'old2', 'old3'])).to_csv('data/individual_queues/tva_active_projects.csv', index = False)
+    monkeypatch.setattr(utils, 'backup_csv_mirror', False)
+    utils.writeBackup(pd.DataFrame(project_rows(['new'])), 'tva')
+    assert utils.readBackup('tva')['id'].tolist() == ['new']
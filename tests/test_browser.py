@@ -0,0 +1,34 @@
+import time
+
+from browser import BrowserPool
+
+class FakeDriver:
+
+    # Stands in for a Chrome webdriver
+    def delete_all_cookies(self):
+        pass
+
+    def get(self, url):
+        pass
+
+    def quit(self):
+        pass
+
+def test_page_waits_for_the_warm_browser(monkeypatch):
+    started = []
+    def startDriver(pool):
+        # Starting Chrome takes a while, long enough for a page to be asked for in the meantime
+        time.sleep(0.2)
+        driver = FakeDriver()
+        started.append(driver)
+        with pool.lock:
+            pool.drivers.append(driver)
+        return driver
+    monkeypatch.setattr(BrowserPool, 'startDriver', startDriver)
+
+    pool = BrowserPool(max_pages = 2)
+    pool.warm()
+    with pool.page() as driver:
+        assert driver is started[0]
+    assert len(started) == 1
+    assert pool.idle_drivers == [driver]
@@ -0,0 +1,36 @@
+import os
+import pytest
+
+import utils
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_unchanged_file_is_read_from_the_cache(workdir, server, stream):
+    server.publish([{'id': '1'}])
+    first = utils.cachedGet('https://example.com/queue', 'miso', stream = stream)
+    second = utils.cachedGet('https://example.com/queue', 'miso', stream = stream)
+
+    assert (first.from_cache, second.from_cache) == (False, True)
+    assert server.requests[-1]['If-None-Match'] == server.etag
+    if stream:
+        assert second.body_path == first.body_path
+        with open(second.body_path) as f:
+            assert f.read() == '[{"id": "1"}]'
+    else:
+        assert second.json() == [{'id': '1'}]
+
+def test_changed_file_is_downloaded_again(workdir, server):
+    server.publish([{'id': '1'}])
+    utils.cachedGet('https://example.com/queue', 'miso')
+    server.publish([{'id': '2'}])
+    response = utils.cachedGet('https://example.com/queue', 'miso')
+    assert (response.from_cache, response.json()) == (False, [{'id': '2'}])
+
+def test_cleared_cache_downloads_again(workdir, server):
+    # A source that fails after downloading clears its cache, so the next run gets the whole file instead of a 304
+    server.publish([{'id': '1'}])
+    utils.cachedGet('https://example.com/queue', 'miso')
+    utils.clearCache('miso')
+    response = utils.cachedGet('https://example.com/queue', 'miso')
+    assert 'If-None-Match' not in server.requests[-1]
+    assert (response.from_cache, response.json()) == (False, [{'id': '1'}])
+    assert os.path.exists('data/http_cache/miso')
@@ -0,0 +1,26 @@
+import pandas as pd
+
+from aggregate import fuel_columns
+from classes import classifyCounties
+from config import class_counts
+
+def makeCounties(rows):
+    counties = pd.DataFrame(rows, columns = list(fuel_columns.values())).astype(float)
+    counties['total_capacity'] = counties.sum(axis = 1)
+    return counties
+
+def test_wind_storage_tie_goes_to_storage():
+    # The old leading fuel layer checked storage after wind, so storage won ties
+    county_data, breaks = classifyCounties(makeCounties([[0, 0, 50, 50, 0, 0]]))
+    assert list(fuel_columns)[county_data['leading_fuel'][0] - 1] == 'Storage'
+
+def test_classes_span_every_color():
+    # Most counties have the same solar total, so qcut finds only three of the five classes
+    totals = [10] * 6 + [20, 30, 40, 50]
+    county_data, breaks = classifyCounties(makeCounties([[total, 0, 0, 0, 0, 0] for total in totals]))
+    assert county_data['class_solar'].tolist() == [1] * 6 + [3, 3, 5, 5]
+    assert breaks['total_solar'] == [14.0, None, 32.0, None, 50.0]
+
+def test_equal_totals_get_a_class():
+    county_data, breaks = classifyCounties(makeCounties([[0, 0, 0, 5, 0, 0]] * 3))
+    assert county_data['class_wind'].tolist() == [class_counts['total_wind']] * 3
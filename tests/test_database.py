@@ -0,0 +1,22 @@
+import pandas as pd
+import geopandas as gpd
+from shapely.geometry import box
+
+import database
+from utils import splitCounties, enforceSchema
+
+def test_split_projects_count_once(workdir, project_rows, monkeypatch):
+    monkeypatch.setattr(database, 'database_path', 'data/gi_queue.sqlite')
+    queue = pd.DataFrame(project_rows(['1', '2'])).assign(capacity = [100.0, 50.0], county = ['Brown, Clark', 'Brown'])
+    counties = gpd.GeoDataFrame({'join_key': ['brown_wi', 'clark_wi']}, geometry = [box(0, 0, 1, 1), box(1, 0, 2, 1)])
+    database.writeDatabase({'miso': enforceSchema(splitCounties(queue))}, counties)
+
+    by_state = database.summarize('state')
+    assert by_state['projects'].tolist() == [2]
+    assert by_state['capacity'].tolist() == [150.0]
+    assert database.query('SELECT county FROM projects WHERE id = ?', ('1',))['county'].tolist() == ['Brown, Clark']
+
+    by_county = database.summarize('join_key').set_index('join_key')
+    assert by_county.loc['brown_wi', 'projects'] == 2
+    assert by_county.loc['brown_wi', 'capacity'] == 100.0
+    assert by_county.loc['clark_wi', 'capacity'] == 50.0
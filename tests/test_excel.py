@@ -0,0 +1,15 @@
+from io import BytesIO
+from openpyxl import Workbook
+
+from excel import readExcel
+
+def test_blank_footer_row_is_part_of_the_footer():
+    # The footer is counted from the last row of the sheet that has anything in it, blank rows included
+    workbook = Workbook()
+    for row in [['Queue Report'], ['ID', 'MW'], ['A', 10], [None, None], ['B', 20], ['C', 30],
+                [None, None], ['Notes: capacities are in MW AC']]:
+        workbook.active.append(row)
+    content = BytesIO()
+    workbook.save(content)
+    projects = readExcel(content.getvalue(), ['ID', 'MW'], footer_rows = 2)
+    assert projects['ID'].tolist() == ['A', 'B', 'C']
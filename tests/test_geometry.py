@@ -0,0 +1,40 @@
+import gzip
+import numpy as np
+import pytest
+import shapely
+import geopandas as gpd
+import mapbox_vector_tile
+from shapely.geometry import Polygon, shape
+
+import tiles
+import geometry
+
+@pytest.fixture
+def neighbors():
+    # Two counties that share a wiggly border, which simplifying them one at a time would move apart
+    latitudes = np.linspace(40, 40.5, 400)
+    border = list(zip(-90 + 0.002 * np.sin(latitudes * 900), latitudes))
+    west = Polygon([(-90.5, 40)] + border + [(-90.5, 40.5)])
+    east = Polygon(border + [(-89.5, 40.5), (-89.5, 40)])
+    return gpd.GeoDataFrame({'join_key': ['west_il', 'east_il'], 'total_capacity': [1.0, 2.0]}, geometry = [west, east], crs = 4326)
+
+def assertBorderShared(polygons):
+    # No overlap between the two counties, and no gap left between them
+    union = shapely.union_all(polygons)
+    assert union.area == pytest.approx(sum(polygon.area for polygon in polygons), rel = 1e-9)
+    assert (union.geom_type == 'Polygon') and (len(union.interiors) == 0)
+
+def test_geojson_counties_share_their_border(neighbors, workdir):
+    counties = geometry.writeCountyGeoJSON(neighbors, 'data/counties.geojson')
+    assertBorderShared(list(counties.geometry))
+
+def test_tiles_share_county_borders_at_every_zoom(neighbors):
+    for tile in tiles.buildTiles(neighbors).values():
+        features = mapbox_vector_tile.decode(gzip.decompress(tile))[tiles.tile_layer]['features']
+        assertBorderShared([shape(feature['geometry']) for feature in features])
+
+def test_old_shapely_is_an_error(neighbors, monkeypatch):
+    # Simplifying each county on its own would quietly open gaps along every border
+    monkeypatch.delattr(shapely, 'coverage_simplify')
+    with pytest.raises(RuntimeError, match = 'shapely 2.1'):
+        geometry.simplifyCoverage(neighbors.geometry.to_numpy(), 0.01)
@@ -0,0 +1,45 @@
+import os
+import json
+import pandas as pd
+
+from utils import enforceSchema
+from incremental import updateCountyAggregates, savePipelineState, pipeline_outputs
+from shards import writeProjectShards, shard_dir
+from cube import writeCube, cube_dir
+
+def runPipeline(queues):
+    # The part of main.py that is updated in place
+    county_aggregates, changed, touched_states, pipeline_state = updateCountyAggregates(queues)
+    projects = enforceSchema(pd.concat(queues.values()))
+    shard_projects = projects.assign(submitted_date = projects['submitted_date'].dt.strftime('%Y-%m-%d'),
+                                    service_date = projects['service_date'].dt.strftime('%Y-%m-%d'))
+    writeProjectShards(shard_projects, rewrite_states = touched_states)
+    writeCube(projects, states = touched_states)
+    savePipelineState(pipeline_state)
+    return changed, touched_states
+
+def test_incremental_run_only_rewrites_touched_states(workdir, project_rows):
+    # The outputs that are always written in full only need to exist
+    os.makedirs('data/cube', exist_ok = True)
+    for path in pipeline_outputs:
+        if not path.endswith('manifest.json'):
+            open(path, 'w').close()
+    miso = pd.DataFrame(project_rows(['1', '2']))
+    pjm = pd.DataFrame(project_rows(['3'])).assign(county = 'Cook', state = 'IL', join_key = 'cook_il', iso_utility = 'PJM')
+    runPipeline({'miso': enforceSchema(miso), 'pjm': enforceSchema(pjm)})
+
+    untouched = [f'{shard_dir}/il.json', f'{cube_dir}/counties/il.json']
+    for path in untouched:
+        os.utime(path, ns = (0, 0))
+
+    miso.loc[0, 'capacity'] = 99.0
+    changed, touched_states = runPipeline({'miso': enforceSchema(miso), 'pjm': enforceSchema(pjm)})
+    assert (changed, touched_states) == (['miso'], {'wi'})
+    assert [os.stat(path).st_mtime_ns for path in untouched] == [0, 0]
+
+    with open(f'{shard_dir}/wi.json') as f:
+        assert [row[2] for row in json.load(f)['counties']['dane_wi']] == [99.0, 10.0]
+    with open(f'{shard_dir}/manifest.json') as f:
+        assert list(json.load(f)['shards']) == ['il', 'wi']
+    with open(f'{cube_dir}/manifest.json') as f:
+        assert {'counties/il', 'counties/wi'} <= set(json.load(f)['tiles'])
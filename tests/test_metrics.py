@@ -0,0 +1,13 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from utils import withSourceContext
+
+def test_nested_threads_count_towards_their_source():
+    metrics.startRun()
+    with metrics.trackSource('duke'):
+        with ThreadPoolExecutor(max_workers = 2) as executor:
+            list(executor.map(withSourceContext(metrics.addBytes), [100, 200]))
+    assert metrics.run['sources']['duke']['bytes_fetched'] == 300
+    assert 'peak_rss_mb' not in metrics.run['sources']['duke']
+    metrics.run = None
@@ -0,0 +1,32 @@
+import os
+import glob
+from io import BytesIO
+import pandas as pd
+from pypdf import PdfWriter
+
+import pdfs
+import utils
+
+def pdfBytes(page_count):
+    writer = PdfWriter()
+    for i in range(page_count):
+        writer.add_blank_page(width = 612, height = 792)
+    content = BytesIO()
+    writer.write(content)
+    return content.getvalue()
+
+def test_pdf_without_pages_gives_an_empty_table(workdir):
+    tables = pdfs.parseTables(pdfBytes(0), 'tva', {})
+    assert (len(tables) == 1) and tables[0].empty
+
+def test_old_tables_are_pruned_and_cleared_with_the_cache(workdir, monkeypatch):
+    # tabula needs a JVM, so it is replaced with one table per page
+    monkeypatch.setattr(pdfs.tabula, 'read_pdf', lambda path, pages, **options: [pd.DataFrame({'page': [page]}) for page in pages])
+    cache_dir = pdfs.pdf_cache_dir.format(source = 'tva')
+
+    assert len(pdfs.parseTables(pdfBytes(2), 'tva', {})) == 2
+    assert len(pdfs.parseTables(pdfBytes(3), 'tva', {})) == 3
+    assert len(glob.glob(f'{cache_dir}/*.pkl')) == 1
+
+    utils.clearCache('tva')
+    assert not os.path.exists(cache_dir)
@@ -0,0 +1,32 @@
+import time
+import pandas as pd
+
+import utils
+import sources
+import scheduler
+
+def test_timed_out_source_downloads_again_next_run(workdir, server, project_rows, monkeypatch):
+    monkeypatch.setattr(scheduler, 'fetch_timeouts', {'miso': 1})
+    for module in [scheduler, sources]:
+        monkeypatch.setattr(module, 'sendEmail', lambda subject, message: None)
+    pd.DataFrame(project_rows(['old'])).to_csv('data/individual_queues/miso_active_projects.csv', index = False)
+    server.publish(project_rows(['new']))
+
+    parse_seconds = 2
+    def fetch():
+        response = utils.cachedGet('https://example.com/queue', 'miso')
+        return None if response.from_cache else response.json()
+    def parse(rows):
+        time.sleep(parse_seconds)
+        return pd.DataFrame(rows)
+    source = {'name': 'miso', 'iso_utility': 'MISO', 'fetch': fetch, 'parse': parse, 'fields': utils.standard_fields}
+
+    # The first run downloads the new data, but runs out of time while parsing it
+    queue, = scheduler.fetchQueues([source])
+    assert queue['id'].tolist() == ['old']
+
+    # The next run must not be told the data is unchanged, since it never made it into the backup
+    parse_seconds = 0
+    queue, = scheduler.fetchQueues([source])
+    assert 'If-None-Match' not in server.requests[-1]
+    assert queue['id'].tolist() == ['new']
@@ -0,0 +1,16 @@
+import pandas as pd
+
+from utils import enforceSchema
+from snapshots import recordSnapshots, changesSince, snapshotRuns
+
+def test_runs_on_the_same_day_keep_their_own_snapshots(workdir, project_rows):
+    queue = enforceSchema(pd.DataFrame(project_rows(['1'])))
+    recordSnapshots({'miso': queue}, ['miso'], run = '2026-10-17T120000Z')
+    recordSnapshots({'miso': enforceSchema(pd.DataFrame(project_rows(['1', '2'])))}, ['miso'], run = '2026-10-18T080000Z')
+    recordSnapshots({'miso': queue}, ['miso'], run = '2026-10-18T200000Z')
+
+    assert snapshotRuns('miso') == ['2026-10-17T120000Z', '2026-10-18T080000Z', '2026-10-18T200000Z']
+    # The project added in the morning and withdrawn in the evening is in the history of that day
+    changes = changesSince('2026-10-18')
+    assert changes[['run', 'change', 'id']].values.tolist() == [['2026-10-18T080000Z', 'added', '2'],
+                                                                ['2026-10-18T200000Z', 'withdrawn', '2']]
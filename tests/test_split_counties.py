@@ -0,0 +1,18 @@
+import pytest
+import pandas as pd
+
+from utils import splitCounties
+
+# Freshly parsed queues have had rows filtered out, or were concatenated, so their index is rarely 0..n-1
+@pytest.mark.parametrize('index', [[5, 17, 42], [7, 7, 7]])
+def test_split_ignores_the_index(index):
+    projects = pd.DataFrame({'id': ['1', '2', '3'],
+                            'capacity': [100.0, 50.0, 30.0],
+                            'county': ['Brown, Clark', 'Dane', 'King and Queen'],
+                            'state': ['WI', 'WI', 'VA']},
+                            index = index)
+    split = splitCounties(projects)
+    assert split['county'].tolist() == ['Brown', 'Clark', 'Dane', 'King and Queen']
+    assert split['join_key'].tolist() == ['brown_wi', 'clark_wi', 'dane_wi', 'kingandqueen_va']
+    assert split['capacity'].tolist() == [50.0, 50.0, 50.0, 30.0]
+    assert split['id'].nunique() == 3